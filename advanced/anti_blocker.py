@@ -1,6 +1,7 @@
 import os
 import random
 import time
+from functools import lru_cache
 from itertools import cycle
 
 _raw_proxies = os.getenv("SAVIFYPRO_PROXIES", "")
@@ -37,10 +38,18 @@ def load_user_agents():
         ]
     return agents
 
-USER_AGENTS = load_user_agents()
+@lru_cache(maxsize=1)
+def _user_agents():
+    # Read on first use, not at import time
+    return load_user_agents()
+
+def __getattr__(name):
+    if name == "USER_AGENTS":
+        return _user_agents()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 def get_random_user_agent():
-    return random.choice(USER_AGENTS)
+    return random.choice(_user_agents())
 
 REFERER_POOL = [
     "https://www.google.com/",
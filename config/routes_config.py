@@ -1,11 +1,30 @@
+import asyncio
+import hmac
+import json
 import os
-from fastapi import FastAPI, Body, File, Query, UploadFile
-from fastapi.responses import FileResponse, JSONResponse
-from config.server_config import FINAL_IP, SERVER_URL
-from core import get_video_info, start_download, start_audio_download
+from fastapi import FastAPI, Body, File, Header, Query, UploadFile, WebSocket, WebSocketDisconnect
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
+import core
+from config.server_config import SERVER_URL
+from core.engine.passthrough import PassthroughBusy, PassthroughError, open_stream
+from core.engine.progressive import PROGRESSIVE, PROGRESSIVE_CHUNK_SIZE, PROGRESSIVE_POLL_INTERVAL, get_progressive_stats
+from core.warmup import get_readiness
 from dir_setup import AUDIO_DIR, VIDEO_DIR
 from utils.converter import convert_video_to_audio, delete_file, save_uploaded_file
-from utils.status_manager import get_status
+from utils.status_manager import get_status, watch
+from utils.artifact_cache import get_artifact_cache_stats
+from utils.state_backend import get_state_backend_stats
+from utils.content_store import CONTENT_STORE, get_content_store_stats
+from utils.storage_index import STORAGE_INDEX, get_storage_stats
+
+# admin endpoints are disabled unless a token is configured
+ADMIN_TOKEN = os.getenv("SAVIFYPRO_ADMIN_TOKEN", "")
+# a status stream with nothing to report still sends this often, so proxies keep it open
+STATUS_KEEPALIVE_SECONDS = 15
+STATUS_REMOTE_POLL_SECONDS = 1.0
+STATUS_TERMINAL = {"completed", "converted", "error", "canceled", "ready"}
 
 
 def register_api_routes(app: FastAPI):
@@ -27,11 +46,53 @@ def register_api_routes(app: FastAPI):
     # -------------------------
     # FORCE DOWNLOAD HANDLER
     # -------------------------
+    async def stream_growing_file(entry, filename: str):
+        fh = await run_in_threadpool(entry.open)
+        if fh is None:
+            return None
+        PROGRESSIVE.count_stream()
+
+        async def body():
+            try:
+                while True:
+                    chunk = await run_in_threadpool(fh.read, PROGRESSIVE_CHUNK_SIZE)
+                    if chunk:
+                        yield chunk
+                        continue
+                    if entry.done.is_set():
+                        # bytes written between our last read and the finish
+                        rest = await run_in_threadpool(fh.read)
+                        if rest and not entry.failed:
+                            yield rest
+                        return
+                    if entry.stalled():
+                        return
+                    await asyncio.sleep(PROGRESSIVE_POLL_INTERVAL)
+            finally:
+                fh.close()
+
+        headers = {
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "Access-Control-Allow-Origin": "*",
+            "Cache-Control": "no-store",
+        }
+        if entry.total_bytes:
+            headers["Content-Length"] = str(entry.total_bytes)
+        return StreamingResponse(body(), media_type="application/octet-stream", headers=headers)
+
     async def serve_media_file(directory: str, filename: str):
         try:
-            filepath = os.path.join(directory, filename)
+            # still downloading: stream what is on disk and follow the file as it grows
+            growing = PROGRESSIVE.get(os.path.join(directory, filename))
+            if growing:
+                response = await stream_growing_file(growing, filename)
+                if response is not None:
+                    return response
 
-            if not os.path.isfile(filepath):
+            # title-named links, or content-store aliases where links are unavailable
+            filepath = CONTENT_STORE.locate(os.path.join(directory, filename))
+
+            if not filepath:
                 return JSONResponse({"error": "File not found"}, status_code=404)
 
             return FileResponse(
@@ -71,13 +132,59 @@ def register_api_routes(app: FastAPI):
             url = payload.get("url", "").strip()
             if not url:
                 return JSONResponse({"error": "URL is required"}, status_code=400)
-            return get_video_info(url)
+            # Extraction blocks; keep it off the event loop
+            return await run_in_threadpool(lambda: core.get_video_info(url))
         except Exception as e:
             return JSONResponse(
                 {"error": f"Failed to extract info: {str(e)}"},
                 status_code=500
             )
 
+    # -------------------------
+    # FETCH VIDEO INFO (BATCH, NDJSON STREAM)
+    # -------------------------
+    @app.post("/api/fetch/batch")
+    async def api_extract_batch(payload: dict = Body(...)):
+        urls = payload.get("urls")
+        if not isinstance(urls, list) or not urls:
+            return JSONResponse({"error": "urls must be a non-empty list"}, status_code=400)
+        if len(urls) > core.BATCH_MAX_URLS:
+            return JSONResponse(
+                {"error": f"At most {core.BATCH_MAX_URLS} URLs per batch"},
+                status_code=400
+            )
+
+        async def ndjson():
+            async for item in core.iter_batch_metadata(urls):
+                yield json.dumps(item, ensure_ascii=False) + "\n"
+
+        return StreamingResponse(
+            ndjson(),
+            media_type="application/x-ndjson",
+            headers={"Cache-Control": "no-store", "X-Accel-Buffering": "no"}
+        )
+
+    # -------------------------
+    # PLAYLIST / CHANNEL (PAGINATED)
+    # -------------------------
+    @app.post("/api/playlist")
+    async def api_playlist(payload: dict = Body(...)):
+        try:
+            url = payload.get("url", "").strip()
+            if not url:
+                return JSONResponse({"error": "URL is required"}, status_code=400)
+            return await run_in_threadpool(
+                lambda: core.extract_playlist_page(url, payload.get("cursor"), payload.get("page_size"))
+            )
+        except ValueError as e:
+            # malformed cursor or page_size
+            return JSONResponse({"error": str(e)}, status_code=400)
+        except Exception as e:
+            return JSONResponse(
+                {"error": f"Failed to extract playlist: {str(e)}"},
+                status_code=500
+            )
+
     # -------------------------
     # VIDEO DOWNLOAD (BACKGROUND)
     # -------------------------
@@ -86,7 +193,6 @@ def register_api_routes(app: FastAPI):
         try:
             url = payload.get("url", "").strip()
             quality = payload.get("quality", "").strip()
-            type_ = payload.get("type", "video").strip().lower()
 
             if not url or not quality:
                 return JSONResponse(
@@ -94,9 +200,20 @@ def register_api_routes(app: FastAPI):
                     status_code=400
                 )
 
-            download_id = start_download(url, quality, type_)
+            # journals the job and reads the info cache: both may hit disk or the network
+            download_id = await run_in_threadpool(lambda: core.start_download(
+                url, quality,
+                bandwidth_limit=payload.get("bandwidth_limit"),
+                plan=payload.get("plan")
+            ))
             return {"download_id": download_id, "status": "started"}
 
+        except core.JobQueueFull:
+            return JSONResponse(
+                {"error": "Download queue is full, please try again shortly"},
+                status_code=503
+            )
+
         except Exception as e:
             return JSONResponse(
                 {"error": f"Failed to start download: {str(e)}"},
@@ -119,9 +236,22 @@ def register_api_routes(app: FastAPI):
                     status_code=400
                 )
 
-            download_id = start_audio_download(url, format_id, headers)
+            download_id = await run_in_threadpool(lambda: core.start_audio_download(
+                url, format_id, headers,
+                plan=payload.get("plan"),
+                audio_format=payload.get("audio_format")
+            ))
             return {"download_id": download_id, "status": "started"}
 
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+
+        except core.JobQueueFull:
+            return JSONResponse(
+                {"error": "Download queue is full, please try again shortly"},
+                status_code=503
+            )
+
         except Exception as e:
             return JSONResponse(
                 {"error": f"Failed to start audio download: {str(e)}"},
@@ -134,12 +264,16 @@ def register_api_routes(app: FastAPI):
     @app.get("/api/status/{download_id}")
     async def api_status(download_id: str):
         try:
-            data = get_status(download_id)
+            data = await run_in_threadpool(get_status, download_id)
             if not data:
                 return JSONResponse(
                     {"error": "Invalid download ID"},
                     status_code=404
                 )
+            # the view is shared and read-only; answer with a shallow copy
+            data = dict(data)
+            if data.get("status") == "queued":
+                data["queue_position"] = core.get_queue_position(download_id)
             return data
 
         except Exception as e:
@@ -148,6 +282,230 @@ def register_api_routes(app: FastAPI):
                 status_code=500
             )
 
+    # -------------------------
+    # STATUS PUSH (SSE / WEBSOCKET)
+    # -------------------------
+    async def status_updates(download_id: str):
+        """
+        Yields the initial status, then the latest one after each change
+        (None when idle for STATUS_KEEPALIVE_SECONDS), until a terminal state
+        or the status is removed.
+        Changes made while the client is still receiving collapse into one.
+        """
+        loop = asyncio.get_running_loop()
+        changed = asyncio.Event()
+
+        def notify():
+            try:
+                loop.call_soon_threadsafe(changed.set)
+            except RuntimeError:
+                # loop already closed: the stream is gone
+                pass
+
+        # a job running in another worker cannot notify us: poll the shared state instead
+        unwatch = watch(download_id, notify)
+        wait = STATUS_KEEPALIVE_SECONDS if unwatch else STATUS_REMOTE_POLL_SECONDS
+        try:
+            last = await run_in_threadpool(get_status, download_id)
+            idle = 0.0
+            while last is not None:
+                yield last
+                if last.get("status") in STATUS_TERMINAL:
+                    return
+                while True:
+                    try:
+                        await asyncio.wait_for(changed.wait(), wait)
+                        break
+                    except asyncio.TimeoutError:
+                        # a local record may also have been dropped without a final state
+                        current = await run_in_threadpool(get_status, download_id)
+                        if current is None or (not unwatch and dict(current) != dict(last)):
+                            break
+                        idle += wait
+                        if idle >= STATUS_KEEPALIVE_SECONDS:
+                            idle = 0.0
+                            yield None
+                changed.clear()
+                idle = 0.0
+                last = await run_in_threadpool(get_status, download_id)
+        finally:
+            if unwatch:
+                unwatch()
+
+    def status_event(download_id: str, view, first: bool) -> dict:
+        data = {k: v for k, v in view.items() if first or k != "history"}
+        if first:
+            data["history"] = list(data["history"])
+        if data.get("status") == "queued":
+            data["queue_position"] = core.get_queue_position(download_id)
+        return data
+
+    @app.get("/api/status/{download_id}/stream")
+    async def api_status_stream(download_id: str):
+        if await run_in_threadpool(get_status, download_id) is None:
+            return JSONResponse({"error": "Invalid download ID"}, status_code=404)
+
+        async def events():
+            updates = status_updates(download_id)
+            first = True
+            try:
+                async for view in updates:
+                    if view is None:
+                        yield ": keepalive\n\n"
+                        continue
+                    # the first event carries the history; later ones only the current state
+                    data = json.dumps(status_event(download_id, view, first), default=str)
+                    first = False
+                    yield f"event: status\ndata: {data}\n\n"
+            finally:
+                # client gone: stop watching now rather than at garbage collection
+                await updates.aclose()
+
+        return StreamingResponse(events(), media_type="text/event-stream", headers={
+            "Cache-Control": "no-store",
+            "X-Accel-Buffering": "no",
+            "Access-Control-Allow-Origin": "*",
+        })
+
+    @app.websocket("/api/status/{download_id}/ws")
+    async def api_status_ws(websocket: WebSocket, download_id: str):
+        await websocket.accept()
+        if await run_in_threadpool(get_status, download_id) is None:
+            await websocket.send_json({"error": "Invalid download ID"})
+            await websocket.close(code=4404)
+            return
+        updates = status_updates(download_id)
+        try:
+            first = True
+            async for view in updates:
+                if view is None:
+                    await websocket.send_json({"keepalive": True})
+                    continue
+                await websocket.send_json(status_event(download_id, view, first))
+                first = False
+            await websocket.close()
+        except (WebSocketDisconnect, RuntimeError):
+            # client went away mid-send
+            pass
+        finally:
+            await updates.aclose()
+
+    # -------------------------
+    # PASSTHROUGH STREAM (NOTHING WRITTEN TO DISK)
+    # -------------------------
+    @app.get("/api/stream")
+    async def api_stream(
+        url: str = Query(...),
+        type: str = Query("video"),
+        quality: str = Query("720p"),
+        bitrate: str = Query("192")
+    ):
+        url = url.strip()
+        if not url:
+            return JSONResponse({"error": "URL is required"}, status_code=400)
+        kind = "audio" if type.lower() == "audio" else "video"
+
+        try:
+            media_type, filename, body, close = await open_stream(url, kind, quality=quality, bitrate=bitrate)
+        except PassthroughBusy:
+            return JSONResponse({"error": "Too many streams running, please try again shortly"}, status_code=503)
+        except PassthroughError as e:
+            return JSONResponse({"error": "Stream failed", "detail": str(e)}, status_code=502)
+        except Exception as e:
+            print(f"[✕] ERROR: Stream failed - {str(e)}")
+            return JSONResponse({"error": f"Stream failed: {str(e)}"}, status_code=500)
+
+        return StreamingResponse(
+            body,
+            media_type=media_type,
+            headers={
+                "Content-Disposition": f'attachment; filename="{filename}"',
+                "Access-Control-Allow-Origin": "*",
+                "Cache-Control": "no-store",
+            },
+            # also runs when the body was never iterated
+            background=BackgroundTask(close),
+        )
+
+    # -------------------------
+    # CANCEL DOWNLOAD
+    # -------------------------
+    @app.post("/api/cancel/{download_id}")
+    async def api_cancel(download_id: str):
+        try:
+            if await run_in_threadpool(core.cancel_download, download_id):
+                return {"status": "canceled", "download_id": download_id}
+            return JSONResponse(
+                {"error": "Unknown or already finished download ID"},
+                status_code=404
+            )
+
+        except Exception as e:
+            return JSONResponse(
+                {"error": f"Cancel failed: {str(e)}"},
+                status_code=500
+            )
+
+    # -------------------------
+    # READINESS (WARM-UP)
+    # -------------------------
+    @app.get("/api/ready")
+    async def api_ready():
+        state = get_readiness()
+        return JSONResponse(state, status_code=200 if state["ready"] else 503)
+
+    # -------------------------
+    # METRICS
+    # -------------------------
+    @app.get("/api/metrics")
+    def api_metrics():
+        # plain def: the journal and shared-state counts are queries, so this runs in the threadpool
+        return {
+            "metadata": core.get_extractor_stats(),
+            "playlists": core.get_playlist_stats(),
+            "ydl_pool": core.get_ydl_pool_stats(),
+            "downloads": core.get_scheduler_stats(),
+            "shared_downloads": core.get_download_job_stats(),
+            "storage": get_storage_stats(),
+            "content_store": get_content_store_stats(),
+            "artifacts": get_artifact_cache_stats(),
+            "registries": core.get_registry_stats(),
+            "journal": core.get_journal_stats(),
+            "progressive": get_progressive_stats(),
+            "passthrough": core.get_passthrough_stats(),
+            "bandwidth": core.get_bandwidth_stats(),
+            "transfer_tuning": core.get_transfer_tuning_stats(),
+            "shared_state": get_state_backend_stats(),
+        }
+
+    # -------------------------
+    # ADMIN: BANDWIDTH LIMITS
+    # -------------------------
+    def admin_denied(token: str):
+        if not ADMIN_TOKEN:
+            return JSONResponse({"error": "Admin endpoints are disabled"}, status_code=403)
+        if not hmac.compare_digest(token, ADMIN_TOKEN):
+            return JSONResponse({"error": "Invalid admin token"}, status_code=401)
+        return None
+
+    @app.get("/api/admin/bandwidth")
+    async def api_get_bandwidth(x_admin_token: str = Header("")):
+        denied = admin_denied(x_admin_token)
+        if denied:
+            return denied
+        return core.get_bandwidth_stats()
+
+    @app.post("/api/admin/bandwidth")
+    async def api_set_bandwidth(payload: dict = Body(...), x_admin_token: str = Header("")):
+        denied = admin_denied(x_admin_token)
+        if denied:
+            return denied
+        try:
+            # e.g. {"total": "200M", "serving_reserve": "40M"}; 0 lifts the limit
+            return core.configure_bandwidth(payload.get("total"), payload.get("serving_reserve"))
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+
     # -------------------------
     # APP UPDATES
     # -------------------------
@@ -207,7 +565,12 @@ def register_api_routes(app: FastAPI):
     @app.delete("/api/delete/{filename}")
     async def delete_audio(filename: str):
         try:
-            if delete_file(filename):
+            path = os.path.join(AUDIO_DIR, os.path.basename(filename))
+            aliased = not os.path.exists(path) and CONTENT_STORE.locate(path)
+            if delete_file(filename) or aliased:
+                # the blob itself goes with the next garbage collection
+                STORAGE_INDEX.discard(path)
+                CONTENT_STORE.forget(path)
                 return {"status": "deleted"}
             return JSONResponse(
                 {"error": "file not found"},
@@ -1,11 +1,11 @@
 import os
 import socket
+from contextlib import asynccontextmanager
+from functools import lru_cache
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-import uvicorn
 
 LOCAL_PROTOCOL = "http"
-LOCAL_IP = socket.gethostbyname(socket.gethostname())
 LOCAL_PORT = 8000
 
 PRODUCTION_PROTOCOL = "https"
@@ -13,25 +13,51 @@ PRODUCTION_SUBDOMAIN = "api"
 PRODUCTION_DOMAIN = "savifypro"
 PRODUCTION_EXTENSION = "com"
 
-FINAL_IP = f"{LOCAL_PROTOCOL}://{LOCAL_IP}:{LOCAL_PORT}"
-
 ENVIRONMENT = os.getenv("SERVER_ENV", "production").lower().strip()
 
+
+@lru_cache(maxsize=1)
+def get_local_ip() -> str:
+    # Resolved on first use instead of at import: the lookup blocks on DNS
+    try:
+        return socket.gethostbyname(socket.gethostname())
+    except OSError:
+        return "127.0.0.1"
+
+
 if ENVIRONMENT == "local":
-    SERVER_HOST = LOCAL_IP
     SERVER_PORT = LOCAL_PORT
-    SERVER_URL = f"{LOCAL_PROTOCOL}://{LOCAL_IP}:{LOCAL_PORT}"
 else:
     SERVER_HOST = "0.0.0.0"
     SERVER_PORT = 8000
     SERVER_URL = f"{PRODUCTION_PROTOCOL}://{PRODUCTION_SUBDOMAIN}.{PRODUCTION_DOMAIN}.{PRODUCTION_EXTENSION}"
 
 
+def __getattr__(name):
+    # LOCAL_IP-derived settings are computed lazily (PEP 562)
+    if name == "LOCAL_IP":
+        return get_local_ip()
+    if name == "FINAL_IP" or (name == "SERVER_URL" and ENVIRONMENT == "local"):
+        return f"{LOCAL_PROTOCOL}://{get_local_ip()}:{LOCAL_PORT}"
+    if name == "SERVER_HOST" and ENVIRONMENT == "local":
+        return get_local_ip()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # warm-up runs in the background; requests are served while it finishes
+    from core.warmup import start_warmup
+    start_warmup()
+    yield
+
+
 def create_app():
     app = FastAPI(
         title="SavifyPro Server",
         description="FastAPI backend for SavifyPro",
-        version="1.0.0"
+        version="1.0.0",
+        lifespan=lifespan
     )
 
     app.add_middleware(
@@ -46,10 +72,15 @@ def create_app():
 
 
 if __name__ == "__main__":
+    import uvicorn
+
+    server_url = __getattr__("SERVER_URL") if ENVIRONMENT == "local" else SERVER_URL
+    server_host = __getattr__("SERVER_HOST") if ENVIRONMENT == "local" else SERVER_HOST
+
     print(f"[CONFIG] Environment: {ENVIRONMENT}")
-    print(f"[CONFIG] SERVER_URL: {SERVER_URL}")
-    print(f"[CONFIG] FINAL_IP: {FINAL_IP}")
-    print(f"[CONFIG] HOST: {SERVER_HOST}, PORT: {SERVER_PORT}")
+    print(f"[CONFIG] SERVER_URL: {server_url}")
+    print(f"[CONFIG] FINAL_IP: {__getattr__('FINAL_IP')}")
+    print(f"[CONFIG] HOST: {server_host}, PORT: {SERVER_PORT}")
 
     app = create_app()
-    uvicorn.run(app, host=SERVER_HOST, port=SERVER_PORT)
+    uvicorn.run(app, host=server_host, port=SERVER_PORT)
@@ -1,3 +1,37 @@
-from core.engine.video_downloader import start_download
-from core.engine.video_info_getter import get_video_info
-from core.engine.audio_downloader import start_audio_download
\ No newline at end of file
+# Engines pull in yt_dlp and its extractors; they are imported on first
+# use (PEP 562) or by the background warm-up in core.warmup.
+import importlib
+
+_EXPORTS = {
+    "start_download": "core.engine.video_downloader",
+    "get_video_info": "core.engine.video_info_getter",
+    "start_audio_download": "core.engine.audio_downloader",
+    "get_extractor_stats": "core.engine.metadata_extractor",
+    "iter_batch_metadata": "core.engine.batch_extractor",
+    "BATCH_MAX_URLS": "core.engine.batch_extractor",
+    "extract_playlist_page": "core.engine.playlist_extractor",
+    "get_playlist_stats": "core.engine.playlist_extractor",
+    "get_ydl_pool_stats": "core.engine.ydl_pool",
+    "get_queue_position": "core.engine.job_scheduler",
+    "get_scheduler_stats": "core.engine.job_scheduler",
+    "JobQueueFull": "core.engine.job_scheduler",
+    "get_download_job_stats": "core.engine.download_jobs",
+    "cancel_download": "core.engine.cancellation",
+    "get_registry_stats": "core.engine.cancellation",
+    "get_journal_stats": "core.engine.job_journal",
+    "get_passthrough_stats": "core.engine.passthrough",
+    "configure_bandwidth": "core.engine.bandwidth",
+    "get_bandwidth_stats": "core.engine.bandwidth",
+    "get_transfer_tuning_stats": "core.engine.transfer_tuner",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
@@ -1,6 +1,5 @@
 import os
 import re
-import threading
 import uuid
 import yt_dlp  # type: ignore
 import time
@@ -9,92 +8,199 @@ from urllib.parse import quote
 
 from advanced.anti_blocker import GLOBAL_PROXY
 from config.server_config import SERVER_URL
-from core.engine.progress_hook import _progress_hook
+from core.engine.bandwidth import GOVERNOR, bandwidth_hook
+from core.engine.download_jobs import DOWNLOADS, running
+from core.engine.job_journal import JOURNAL
+from core.engine.job_scheduler import PRIORITY_AUDIO, SCHEDULER
+from core.engine.metadata_extractor import resolve_download_info
+from core.engine.progress_hook import make_progress_hook, requested_total
+from core.engine.transfer_tuner import TUNER, transfer_host
+from core.engine.ydl_pool import YDL_POOLS
 from dir_setup import AUDIO_DIR
 from utils.cookie_loader import prepare_cookie_file
 from utils.filename_generator import generate_audio_filename
-from utils.platform_detector import detect_platform, merge_headers_with_cookie
-from utils.status_manager import update_status
+from utils.platform_detector import detect_platform, media_key, merge_headers_with_cookie
+from utils.artifact_cache import ARTIFACT_CACHE, artifact_key
+from utils.content_store import CONTENT_STORE, IntegrityError
+from utils.storage_index import STORAGE_INDEX
 
-_download_threads = {}
-_download_locks = {}
+def _remove_quietly(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
 
-def start_audio_download(url: str, bitrate: str = "128kbps", headers: dict = None) -> str:
+DEFAULT_AUDIO_QUALITY = "192"
+DEFAULT_AUDIO_FORMAT = "mp3"
+
+# Output formats a client may ask for: source selector preferring streams
+# that need no transcoding, and the extension each source codec lands in
+# when FFmpegExtractAudio copies it ("best" keeps whatever the source is).
+AUDIO_FORMATS = {
+    "mp3": "bestaudio[ext=m4a]/bestaudio/best",
+    "m4a": "bestaudio[ext=m4a]/bestaudio[acodec^=mp4a]/bestaudio/best",
+    "opus": "bestaudio[acodec=opus]/bestaudio/best",
+    "best": "bestaudio/best",
+}
+_COPY_EXTS = {"aac": "m4a", "mp3": "mp3", "opus": "opus", "vorbis": "ogg", "flac": "flac"}
+
+def _codec_family(acodec: str):
+    acodec = (acodec or "").lower()
+    if acodec.startswith("mp4a") or acodec == "aac":
+        return "aac"
+    for family in ("mp3", "opus", "vorbis", "flac"):
+        if acodec.startswith(family):
+            return family
+    return None
+
+def _audio_path(source: dict, target: str):
+    """
+    Mirror of FFmpegExtractAudio's choice: 'original' (file kept as
+    downloaded), 'stream_copy' (remuxed, no re-encode) or 'transcode'.
+    Returns (path, output extension).
+    """
+    family = _codec_family(source.get("acodec"))
+    if family and (target == "best" or target == family or (target == "m4a" and family == "aac")):
+        ext = _COPY_EXTS[family]
+        return ("original" if source.get("ext") == ext else "stream_copy"), ext
+    return "transcode", ("mp3" if target == "best" else target)
+
+def _preferred_quality(format_id: str, info: dict) -> str:
+    """MP3 bitrate matching the requested format: `fallback_<kbps>` or the source abr."""
+    if format_id and format_id.startswith("fallback_"):
+        return re.sub(r"[^0-9]", "", format_id) or DEFAULT_AUDIO_QUALITY
+    for f in info.get("formats") or []:
+        if f.get("format_id") == format_id and f.get("abr"):
+            return str(int(f["abr"]))
+    return DEFAULT_AUDIO_QUALITY
+
+def start_audio_download(url: str, format_id: str = None, headers: dict = None, plan: str = None,
+                         download_id: str = None, audio_format: str = None) -> str:
     """
     Starts an asynchronous audio download from a given URL.
+    `format_id` is one of the audioFormats ids returned by /api/fetch;
+    `audio_format` is the container the client accepts (mp3, m4a, opus or
+    best); `download_id` is only passed when resuming a journaled job.
     Returns a download_id which can be used to poll status.
     """
-    download_id = str(uuid.uuid4())
-    cancel_event = threading.Event()
-    _download_locks[download_id] = cancel_event
+    download_id = download_id or str(uuid.uuid4())
+    audio_format = (audio_format or DEFAULT_AUDIO_FORMAT).lower()
+    if audio_format not in AUDIO_FORMATS:
+        raise ValueError(f"Unsupported audio format: {audio_format}")
+
+    # Identical requests share one transfer; each caller keeps its own download_id
+    media = media_key(url)
+    # mp3 keeps its historical key so existing index entries still hit
+    quality = format_id or ""
+    if audio_format != DEFAULT_AUDIO_FORMAT:
+        quality = f"{quality}:{audio_format}"
+    job, created = DOWNLOADS.acquire(("audio", media, quality), download_id)
+    cancel_event = job.cancel_event
+    if not created:
+        return download_id
+    # plans are signed per process, so a resumed job re-resolves instead
+    JOURNAL.record(download_id, "audio", url, {"format_id": format_id, "headers": headers, "audio_format": audio_format})
 
     platform = detect_platform(url)
 
     def run():
-        update_status(download_id, {
+        if cancel_event.is_set():
+            DOWNLOADS.release(job)
+            return
+        job.publish({
             "status": "starting",
             "progress": 0,
             "speed": "0KB/s",
             "audio_url": None
         })
+        transfer = None
 
         try:
+            existing_file = STORAGE_INDEX.lookup("audio", media, quality)
+            if existing_file:
+                audio_url = f"{SERVER_URL}/download/audio/{quote(os.path.basename(existing_file))}"
+                job.publish({
+                    "status": "completed",
+                    "progress": 100,
+                    "speed": "0KB/s",
+                    "audio_url": audio_url
+                })
+                return
+
             # Merge any provided headers with cookie-based headers for platform
             merged_headers = merge_headers_with_cookie(headers or {}, platform)
             cookie_file = prepare_cookie_file(headers, platform)
 
-            # Attempt to get title for filename
-            title = "audio"
-            try:
-                with yt_dlp.YoutubeDL({
-                    "quiet": True,
-                    "skip_download": True,
-                    "http_headers": merged_headers,
-                    "cookiefile": cookie_file if cookie_file else None
-                }) as ydl:
-                    info = ydl.extract_info(url, download=False)
-                    if isinstance(info, dict) and info.get("title"):
-                        title = info["title"]
-            except Exception:
-                # Ignore extract title failure
-                pass
+            # Reuse the /api/fetch extraction (or its signed plan) instead of re-extracting
+            info, info_source = resolve_download_info(url, plan, merged_headers, cookie_file)
+            title = info.get("title") or "audio"
 
             safe_title_no_ext = generate_audio_filename(title)
             output_path_no_ext = os.path.join(AUDIO_DIR, safe_title_no_ext)
+            job.output_prefix = output_path_no_ext
+            JOURNAL.set_output(job.primary_id, job.output_prefix)
 
             outtmpl = f"{output_path_no_ext}.%(ext)s"
-            expected_mp3_path = f"{output_path_no_ext}.mp3"
+            final_file = None
 
-            # If already downloaded, skip
-            existing_file = None
-            for file in os.listdir(AUDIO_DIR):
-                if file.lower().startswith(safe_title_no_ext.lower()) and file.lower().endswith(".mp3"):
-                    existing_file = os.path.join(AUDIO_DIR, file)
-                    break
+            # Honour the requested format, falling back to the stream that needs the least work
+            preferred_quality = _preferred_quality(format_id, info)
+            format_selector = AUDIO_FORMATS[audio_format]
+            if format_id and not format_id.startswith("fallback_"):
+                format_selector = f"{format_id}/{format_selector}"
 
-            if existing_file and os.path.getsize(existing_file) > 0:
-                audio_url = f"{SERVER_URL}/download/audio/{quote(os.path.basename(existing_file))}"
-                update_status(download_id, {
+            # The storage copy is wiped every cleaner pass; the encoded artifact outlives it
+            cache_key = artifact_key(media, audio_format, preferred_quality, {"format": format_selector})
+            cached = ARTIFACT_CACHE.fetch(cache_key, output_path_no_ext)
+            if cached:
+                # placed from the artifact's own bytes: no need to hash them again
+                stored = CONTENT_STORE.ingest(cached, digest=ARTIFACT_CACHE.digest(cache_key))
+                STORAGE_INDEX.add("audio", media, quality, cached, digest=stored["digest"])
+                job.publish({
                     "status": "completed",
                     "progress": 100,
                     "speed": "0KB/s",
-                    "audio_url": audio_url
+                    "audio_url": f"{SERVER_URL}/download/audio/{quote(os.path.basename(cached))}",
+                    "filesize": stored["size"],
+                    "filename": os.path.basename(cached),
+                    "audio_path": "cached"
                 })
                 return
 
-            # Determine preferred quality
-            preferred_quality = re.sub(r"kbps?", "", bitrate, flags=re.IGNORECASE)
+            def postprocessor_hook(d):
+                if d.get("postprocessor") != "ExtractAudio" or d.get("status") != "started":
+                    return
+                source = d.get("info_dict") or {}
+                path, ext = _audio_path(source, audio_format)
+                job.publish({
+                    "phase": "converting" if path == "transcode" else "remuxing",
+                    "audio_path": path,
+                    "codec": _codec_family(source.get("acodec")) or source.get("acodec"),
+                })
+
+            def post_hook(filepath):
+                # the file left after every postprocessor; the ExtractAudio events
+                # only carry its input, which yt-dlp deletes afterwards
+                nonlocal final_file
+                final_file = filepath
 
-            concurrency = max(6, min(16, (os.cpu_count() or 4)))
+            # fragment fan-out and chunk size learned for this CDN; CPU-based until measured
+            transfer = TUNER.sample(transfer_host(info, platform), max(6, min(16, (os.cpu_count() or 4))), 10 * 1024 * 1024)
 
             # Options for youtube + general
             ydl_opts = {
-                "format": "bestaudio[ext=m4a]/bestaudio/best",
+                "format": format_selector,
                 "outtmpl": outtmpl,
                 "noplaylist": True,
                 "http_headers": merged_headers,
-                "progress_hooks": [lambda d: _progress_hook(d, download_id, cancel_event)],
-                "concurrent_fragment_downloads": concurrency,
+                "progress_hooks": [
+                    bandwidth_hook(job, cancel_event),
+                    transfer.hook,
+                ],
+                "postprocessor_hooks": [postprocessor_hook],
+                "post_hooks": [post_hook],
+                "concurrent_fragment_downloads": transfer.concurrency,
+                "http_chunk_size": transfer.chunk_size,
                 "continuedl": True,
                 "retries": 10,
                 "fragment_retries": 10,
@@ -103,9 +209,11 @@ def start_audio_download(url: str, bitrate: str = "128kbps", headers: dict = Non
                 "quiet": False,
                 "noprogress": False,
                 "no_warnings": True,
+                # copies the stream (or leaves the file alone) whenever the source
+                # codec already fits `audio_format`; only re-encodes otherwise
                 "postprocessors": [{
                     "key": "FFmpegExtractAudio",
-                    "preferredcodec": "mp3",
+                    "preferredcodec": audio_format,
                     "preferredquality": preferred_quality
                 }],
                 "postprocessor_args": [
@@ -128,32 +236,44 @@ def start_audio_download(url: str, bitrate: str = "128kbps", headers: dict = Non
                 ydl_opts["proxy"] = GLOBAL_PROXY
 
             # Launch download
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                ydl.download([url])
+            with YDL_POOLS.checkout("audio", ydl_opts) as ydl, running(job):
+                ydl.add_progress_hook(make_progress_hook(job.publish, cancel_event, requested_total(ydl, info)))
+                try:
+                    ydl.process_ie_result(info, download=True)
+                except yt_dlp.utils.DownloadError:
+                    if info_source == "extracted" or cancel_event.is_set():
+                        raise
+                    # Cached stream URLs can go stale early; fall back to a fresh extraction
+                    ydl.download([url])
 
             if cancel_event.is_set():
-                update_status(download_id, {"status": "cancelled"})
+                job.finish_cancelled()
                 return
+            transfer.finish(True)
 
-            # Find final mp3
-            final_file = None
-            for f in os.listdir(AUDIO_DIR):
-                if f.lower().startswith(safe_title_no_ext.lower()) and f.lower().endswith(".mp3"):
-                    final_file = os.path.join(AUDIO_DIR, f)
-                    break
-
-            if not final_file or os.path.getsize(final_file) == 0:
-                raise FileNotFoundError("No MP3 output created.")
+            if not final_file or not os.path.exists(final_file) or os.path.getsize(final_file) == 0:
+                raise FileNotFoundError("No audio output created.")
 
+            # Hash once while moving the bytes into the content store; truncated output fails here
+            stored = CONTENT_STORE.ingest(final_file)
+            STORAGE_INDEX.add("audio", media, quality, final_file, digest=stored["digest"])
+            ARTIFACT_CACHE.put(cache_key, CONTENT_STORE.locate(final_file) or stored["blob"], digest=stored["digest"])
             audio_url = f"{SERVER_URL}/download/audio/{quote(os.path.basename(final_file))}"
-            update_status(download_id, {
+            job.publish({
                 "status": "completed",
                 "progress": 100,
                 "speed": "0KB/s",
-                "audio_url": audio_url
+                "audio_url": audio_url,
+                "filesize": stored["size"],
+                "filename": os.path.basename(final_file)
             })
 
         except yt_dlp.utils.DownloadError as e:
+            if cancel_event.is_set():
+                job.finish_cancelled()
+                return
+            if transfer:
+                transfer.finish(False, str(e))
             msg = str(e).lower()
             error_msg = (
                 "Login or CAPTCHA required." if ("sign in" in msg or "captcha" in msg) else
@@ -161,16 +281,31 @@ def start_audio_download(url: str, bitrate: str = "128kbps", headers: dict = Non
                 "Format unavailable or private content." if "requested format not available" in msg else
                 "Audio download failed."
             )
-            update_status(download_id, {"status": "error", "error": error_msg})
+            job.publish({"status": "error", "error": error_msg})
+
+        except IntegrityError as e:
+            print(f"[✕] ERROR: {e}")
+            if final_file:
+                _remove_quietly(final_file)
+            job.publish({"status": "error", "error": "Downloaded file is incomplete, please retry."})
 
         except Exception:
+            if cancel_event.is_set():
+                job.finish_cancelled()
+                return
             traceback.print_exc()
-            update_status(download_id, {
+            job.publish({
                 "status": "error",
                 "error": "Unexpected error occurred while downloading."
             })
 
-    thread = threading.Thread(target=run, daemon=True)
-    _download_threads[download_id] = thread
-    thread.start()
+        finally:
+            GOVERNOR.forget(job)
+            DOWNLOADS.release(job)
+
+    try:
+        SCHEDULER.submit(download_id, run, platform=platform, priority=PRIORITY_AUDIO, publish=job.publish)
+    except Exception:
+        DOWNLOADS.release(job)
+        raise
     return download_id
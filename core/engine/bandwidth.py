@@ -0,0 +1,163 @@
+# core/engine/bandwidth.py
+
+import os
+import threading
+import time
+
+
+def parse_rate(value):
+    """Bytes per second from 500K / 20M / 1G / a plain number; falsy means unlimited."""
+    if not value:
+        return 0
+    if isinstance(value, (int, float)):
+        return max(0, int(value))
+    s = str(value).strip().upper().rstrip("/S").rstrip("B")
+    units = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+    try:
+        if s and s[-1] in units:
+            return max(0, int(float(s[:-1]) * units[s[-1]]))
+        return max(0, int(float(s)))
+    except ValueError:
+        raise ValueError(f"Invalid rate: {value}")
+
+
+# whole-box egress budget shared by every download; 0 disables the governor
+BANDWIDTH_TOTAL = parse_rate(os.getenv("SAVIFYPRO_BANDWIDTH_TOTAL", "0"))
+# carved out of the total and never handed to downloads, so file serving keeps headroom
+BANDWIDTH_SERVING_RESERVE = parse_rate(os.getenv("SAVIFYPRO_BANDWIDTH_SERVING_RESERVE", "0"))
+# how long a bucket may bank unused tokens
+BANDWIDTH_BURST_SECONDS = 1.0
+# a job that has not drawn for this long no longer counts toward the fair share
+BANDWIDTH_IDLE_SECONDS = 2.0
+# never hand downloads less than this, however large the reservation
+_MIN_DOWNLOAD_RATE = 64 * 1024
+# longest single wait, so cancellation and limit changes take effect quickly
+_MAX_SLEEP = 0.5
+
+
+class TokenBucket:
+    def __init__(self, rate: int):
+        self.rate = rate
+        self.tokens = rate * BANDWIDTH_BURST_SECONDS
+        self.updated = time.monotonic()
+
+    def reserve(self, n: int, now: float) -> float:
+        """Take `n` tokens (going into debt if needed); returns how long to wait."""
+        self.tokens = min(self.rate * BANDWIDTH_BURST_SECONDS, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= n
+        return -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+
+class BandwidthGovernor:
+    """
+    One token bucket for all download traffic plus one per active job.
+
+    Every job draws each chunk from the global bucket and from its own,
+    whose rate is the download budget split evenly between the jobs that
+    drew recently, so one job cannot starve the rest. The download budget
+    is the total minus the serving reservation.
+    """
+
+    def __init__(self, total: int, serving_reserve: int):
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._counters = {"bytes": 0, "throttled": 0, "wait_seconds": 0.0}
+        self.configure(total, serving_reserve)
+
+    def configure(self, total: int = None, serving_reserve: int = None):
+        """Change limits at runtime; running jobs pick them up on their next chunk."""
+        with self._lock:
+            if total is not None:
+                self.total = total
+            if serving_reserve is not None:
+                self.serving_reserve = serving_reserve
+            self.download_rate = max(_MIN_DOWNLOAD_RATE, self.total - self.serving_reserve) if self.total else 0
+            self._global = TokenBucket(self.download_rate) if self.download_rate else None
+            self._jobs.clear()
+
+    def _fair_rate(self, now: float) -> float:
+        active = sum(1 for b in self._jobs.values() if now - b.updated < BANDWIDTH_IDLE_SECONDS)
+        return self.download_rate / max(1, active)
+
+    def consume(self, job_key, n: int, cancel_event=None):
+        """Account `n` bytes received by `job_key`, sleeping until the budget allows them."""
+        if n <= 0 or not self.download_rate:
+            return
+        with self._lock:
+            now = time.monotonic()
+            bucket = self._jobs.get(job_key)
+            if bucket is None:
+                bucket = self._jobs[job_key] = TokenBucket(self._fair_rate(now))
+            bucket.rate = self._fair_rate(now)
+            delay = max(self._global.reserve(n, now), bucket.reserve(n, now))
+            self._counters["bytes"] += n
+            if delay:
+                self._counters["throttled"] += 1
+                self._counters["wait_seconds"] += delay
+
+        while delay > 0:
+            step = min(delay, _MAX_SLEEP)
+            if cancel_event is not None:
+                if cancel_event.wait(step):
+                    return
+            else:
+                time.sleep(step)
+            delay -= step
+
+    def forget(self, job_key):
+        with self._lock:
+            self._jobs.pop(job_key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            now = time.monotonic()
+            stats = dict(self._counters)
+            stats["wait_seconds"] = round(stats["wait_seconds"], 2)
+            stats.update({
+                "total": self.total,
+                "serving_reserve": self.serving_reserve,
+                "download_rate": self.download_rate,
+                "active_jobs": sum(1 for b in self._jobs.values() if now - b.updated < BANDWIDTH_IDLE_SECONDS),
+                "fair_share": int(self._fair_rate(now)) if self.download_rate else 0,
+            })
+        return stats
+
+
+GOVERNOR = BandwidthGovernor(BANDWIDTH_TOTAL, BANDWIDTH_SERVING_RESERVE)
+
+
+def bandwidth_hook(job, cancel_event):
+    """
+    yt-dlp progress hook drawing every received chunk from the governor.
+    downloaded_bytes is cumulative per file (fragment threads share one
+    counter), so only its growth is charged.
+    """
+    last = {}
+    lock = threading.Lock()
+
+    def hook(d):
+        if d.get("status") != "downloading":
+            return
+        key = d.get("tmpfilename") or d.get("filename")
+        downloaded = d.get("downloaded_bytes") or 0
+        with lock:
+            delta = downloaded - last.get(key, 0)
+            if delta > 0 or key not in last:
+                last[key] = downloaded
+        GOVERNOR.consume(job, delta, cancel_event)
+
+    return hook
+
+
+def configure_bandwidth(total=None, serving_reserve=None) -> dict:
+    GOVERNOR.configure(
+        parse_rate(total) if total is not None else None,
+        parse_rate(serving_reserve) if serving_reserve is not None else None,
+    )
+    print(f"[!] INFO: Bandwidth limits set: total={GOVERNOR.total} B/s, serving reserve={GOVERNOR.serving_reserve} B/s")
+    return GOVERNOR.stats()
+
+
+def get_bandwidth_stats():
+    return GOVERNOR.stats()
@@ -0,0 +1,57 @@
+# core/engine/batch_extractor.py
+
+import asyncio
+import os
+import traceback
+
+from core.engine.metadata_extractor import extract_metadata, get_cached_metadata
+
+BATCH_CONCURRENCY = int(os.getenv("SAVIFYPRO_BATCH_CONCURRENCY", "8"))
+BATCH_MAX_URLS = int(os.getenv("SAVIFYPRO_BATCH_MAX_URLS", "50"))
+
+
+def _extract_safely(url, headers):
+    try:
+        return extract_metadata(url, headers=headers)
+    except Exception:
+        traceback.print_exc()
+        return {"error": "Extraction failed"}
+
+
+async def iter_batch_metadata(urls, headers=None, concurrency=BATCH_CONCURRENCY):
+    """
+    Yield one result per URL as soon as it is ready, tagged with its
+    position in `urls`. Cache hits come first, before any extraction
+    starts; misses run in parallel, at most `concurrency` at a time.
+    """
+    pending = []
+    for index, url in enumerate(urls):
+        url = url.strip() if isinstance(url, str) else ""
+        if not url:
+            yield {"index": index, "url": url, "error": "URL is required"}
+            continue
+        # the metadata cache may live in SQLite or Redis
+        cached = await asyncio.to_thread(get_cached_metadata, url)
+        if cached:
+            yield {"index": index, **cached}
+        else:
+            pending.append((index, url))
+
+    if not pending:
+        return
+
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def run_one(index, url):
+        async with semaphore:
+            result = await asyncio.to_thread(_extract_safely, url, headers)
+        return {"index": index, "url": url, **result}
+
+    tasks = [asyncio.create_task(run_one(index, url)) for index, url in pending]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        # client went away: drop extractions that have not started yet
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,43 @@
+# core/engine/cancellation.py
+
+from core.engine.download_jobs import DOWNLOADS
+from core.engine.job_scheduler import SCHEDULER
+from core.engine.metadata_extractor import cancel_extraction, pending_extractions
+from utils.status_manager import get_status_stats, mark_cancelled
+
+
+def cancel_download(download_id: str) -> bool:
+    """
+    Cancel one request. A shared download only stops once its last
+    requester cancels; until then the others keep receiving updates.
+    Returns False for unknown or already finished ids.
+    """
+    if cancel_extraction(download_id):
+        return True
+
+    job, remaining = DOWNLOADS.detach(download_id)
+    if job is None:
+        return False
+    mark_cancelled(download_id)
+    if remaining:
+        return True
+
+    job.cancel()
+    if SCHEDULER.cancel(job.primary_id):
+        # never started, so nothing was written
+        DOWNLOADS.release(job)
+    # otherwise the worker sees the event, removes partial files and releases the job
+    return True
+
+
+def get_registry_stats():
+    """Sizes of every per-download registry; these should stay flat under steady load."""
+    shared = DOWNLOADS.stats()
+    return {
+        "shared_jobs": shared["in_flight"],
+        "tracked_download_ids": shared["tracked_ids"],
+        "child_processes": shared["processes"],
+        "pending_extractions": pending_extractions(),
+        "queued_downloads": SCHEDULER.stats()["queued"],
+        "statuses": get_status_stats()["entries"],
+    }
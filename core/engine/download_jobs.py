@@ -0,0 +1,211 @@
+# core/engine/download_jobs.py
+
+import glob
+import os
+import re
+import threading
+from contextlib import contextmanager
+
+from core.engine.job_journal import JOURNAL
+from utils.status_manager import update_status
+
+# job whose yt-dlp run owns the current thread, for subprocess tracking
+_local = threading.local()
+_patch_lock = threading.Lock()
+
+# what yt-dlp leaves after <output_prefix>: .part/.ytdl files, fragments, merge
+# parts (.f137.mp4) and postprocessor temps (.temp.mp4); never a finished output
+_INTERMEDIATE = re.compile(r"^(\.f[\w-]+\.\w+|\.temp\.\w+|(\.[\w-]+)+\.(part(-Frag\d+)?|ytdl))$")
+
+
+def _kill(proc):
+    try:
+        if proc.poll() is None:
+            proc.kill()
+    except OSError:
+        pass
+
+
+class SharedJob:
+    """
+    One running download and every download_id attached to it. Status
+    updates are published to all of them; late joiners first receive a
+    snapshot of everything published so far.
+    """
+
+    def __init__(self, key, download_id: str):
+        self.key = key
+        self.primary_id = download_id
+        self.download_ids = [download_id]
+        self.cancel_event = threading.Event()
+        self.finished = False
+        # output path without extension; yt-dlp's intermediates all share it
+        self.output_prefix = None
+        self._processes = []
+        self._state = {}
+        self._lock = threading.Lock()
+
+    @property
+    def status(self):
+        with self._lock:
+            return self._state.get("status")
+
+    def publish(self, data: dict):
+        with self._lock:
+            self._state.update(data)
+            ids = list(self.download_ids)
+        for download_id in ids:
+            update_status(download_id, data)
+
+    def attach(self, download_id: str):
+        with self._lock:
+            self.download_ids.append(download_id)
+            snapshot = dict(self._state)
+        # even an empty update creates the record, so the new id polls as known
+        update_status(download_id, snapshot)
+
+    def track_process(self, proc):
+        with self._lock:
+            self._processes = [p for p in self._processes if p.poll() is None]
+            self._processes.append(proc)
+            cancelled = self.cancel_event.is_set()
+        if cancelled:
+            _kill(proc)
+
+    def process_count(self) -> int:
+        with self._lock:
+            return sum(1 for p in self._processes if p.poll() is None)
+
+    def cancel(self):
+        """Stop the transfer at its next progress callback and kill any ffmpeg child now."""
+        self.cancel_event.set()
+        with self._lock:
+            processes = list(self._processes)
+        for proc in processes:
+            _kill(proc)
+
+    def remove_partials(self):
+        if not self.output_prefix:
+            return
+        pattern = glob.escape(self.output_prefix) + ".*"
+        for path in glob.glob(pattern):
+            if not _INTERMEDIATE.match(path[len(self.output_prefix):]):
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def finish_cancelled(self):
+        self.remove_partials()
+        self.publish({"status": "canceled", "message": "Download canceled by user"})
+
+
+class DownloadRegistry:
+    """In-flight downloads keyed on (type, media key, quality)."""
+
+    def __init__(self):
+        self._jobs = {}
+        self._by_download_id = {}
+        self._lock = threading.Lock()
+        self._counters = {"started": 0, "attached": 0}
+
+    def acquire(self, key, download_id: str):
+        """Returns (job, created). `created` is False when `download_id` joined a running job."""
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None and not job.finished and not job.cancel_event.is_set():
+                self._by_download_id[download_id] = job
+                self._counters["attached"] += 1
+                # attach under the registry lock so release() cannot slip in between
+                job.attach(download_id)
+                JOURNAL.attach(job.primary_id, download_id)
+                return job, False
+
+            job = SharedJob(key, download_id)
+            self._jobs[key] = job
+            self._by_download_id[download_id] = job
+            self._counters["started"] += 1
+            return job, True
+
+    def release(self, job: SharedJob):
+        """Called once the job published its final status."""
+        JOURNAL.finish(job.primary_id)
+        with self._lock:
+            job.finished = True
+            if self._jobs.get(job.key) is job:
+                del self._jobs[job.key]
+            for download_id in job.download_ids:
+                if self._by_download_id.get(download_id) is job:
+                    del self._by_download_id[download_id]
+
+    def detach(self, download_id: str):
+        """Drop one requester. Returns (job, requesters left) or (None, 0)."""
+        with self._lock:
+            job = self._by_download_id.pop(download_id, None)
+            if job is None:
+                return None, 0
+            with job._lock:
+                if download_id in job.download_ids:
+                    job.download_ids.remove(download_id)
+                remaining = len(job.download_ids)
+        JOURNAL.detach(job.primary_id, download_id)
+        return job, remaining
+
+    def job_for(self, download_id: str):
+        with self._lock:
+            return self._by_download_id.get(download_id)
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._counters)
+            stats["in_flight"] = len(self._jobs)
+            stats["tracked_ids"] = len(self._by_download_id)
+            jobs = list(self._jobs.values())
+        stats["processes"] = sum(job.process_count() for job in jobs)
+        return stats
+
+
+DOWNLOADS = DownloadRegistry()
+
+
+@contextmanager
+def running(job: SharedJob):
+    """Bind `job` to this thread so subprocesses yt-dlp spawns can be killed on cancel."""
+    _track_popen()
+    _local.job = job
+    try:
+        yield job
+    finally:
+        _local.job = None
+        with job._lock:
+            job._processes = []
+
+
+def _track_popen():
+    # yt-dlp starts ffmpeg (merger, converters, ffmpeg downloader) through yt_dlp.utils.Popen
+    from yt_dlp.utils import Popen  # type: ignore
+
+    with _patch_lock:
+        if getattr(Popen, "_savify_tracked", False):
+            return
+        original = Popen.__init__
+
+        def __init__(self, *args, **kwargs):
+            original(self, *args, **kwargs)
+            job = getattr(_local, "job", None)
+            if job is not None:
+                job.track_process(self)
+
+        Popen.__init__ = __init__
+        Popen._savify_tracked = True
+
+
+def primary_download_id(download_id: str) -> str:
+    """The download_id the scheduler knows a (possibly attached) request by."""
+    job = DOWNLOADS.job_for(download_id)
+    return job.primary_id if job else download_id
+
+
+def get_download_job_stats():
+    return DOWNLOADS.stats()
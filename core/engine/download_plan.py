@@ -0,0 +1,94 @@
+# core/engine/download_plan.py
+
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import time
+import zlib
+
+from utils.platform_detector import media_key
+
+# Set SAVIFYPRO_PLAN_SECRET to share plans between workers; otherwise each
+# process signs with its own random key and foreign plans are ignored.
+PLAN_SECRET = (os.getenv("SAVIFYPRO_PLAN_SECRET") or secrets.token_hex(32)).encode("utf-8")
+
+_FORMAT_FIELDS = (
+    "format_id", "url", "ext", "protocol", "height", "width",
+    "fps", "vcodec", "acodec", "abr", "tbr", "filesize",
+)
+
+
+def _sign(payload: bytes) -> str:
+    return hmac.new(PLAN_SECRET, payload, hashlib.sha256).hexdigest()[:32]
+
+
+def sign_plan(url: str, info: dict, format_ids, expires_at: float) -> str:
+    """
+    Pack everything a downloader needs to skip extraction (title, the
+    offered format_ids and their stream URLs) into a signed opaque token.
+    """
+    wanted = set(format_ids)
+    formats = [
+        [f.get(k) for k in _FORMAT_FIELDS]
+        for f in info.get("formats") or []
+        if f.get("format_id") in wanted and f.get("url")
+    ]
+    headers = next((f["http_headers"] for f in info.get("formats") or [] if f.get("http_headers")), None)
+
+    plan = {
+        "u": url,
+        "i": info.get("id"),
+        "t": info.get("title"),
+        "w": info.get("webpage_url"),
+        "x": info.get("extractor"),
+        "k": info.get("extractor_key"),
+        "d": info.get("duration"),
+        "h": headers,
+        "e": int(expires_at),
+        "f": formats,
+    }
+    raw = zlib.compress(json.dumps(plan, separators=(",", ":")).encode("utf-8"), 9)
+    return f"{base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')}.{_sign(raw)}"
+
+
+def load_plan(token: str, url: str) -> dict | None:
+    """
+    Verify a plan token and rebuild a yt-dlp info dict from it.
+    Returns None for tampered, expired or foreign plans.
+    """
+    if not token or "." not in token:
+        return None
+    try:
+        body, signature = token.rsplit(".", 1)
+        raw = base64.urlsafe_b64decode(body + "=" * (-len(body) % 4))
+        if not hmac.compare_digest(_sign(raw), signature):
+            return None
+        plan = json.loads(zlib.decompress(raw))
+    except (ValueError, zlib.error):
+        return None
+
+    if plan.get("e", 0) <= time.time() or not plan.get("f"):
+        return None
+    if plan.get("u") != url and media_key(plan.get("u") or "") != media_key(url):
+        return None
+
+    formats = []
+    for values in plan["f"]:
+        fmt = {k: v for k, v in zip(_FORMAT_FIELDS, values) if v is not None}
+        if plan.get("h"):
+            fmt["http_headers"] = dict(plan["h"])
+        formats.append(fmt)
+
+    return {
+        "id": plan.get("i"),
+        "title": plan.get("t"),
+        "webpage_url": plan.get("w") or url,
+        "original_url": url,
+        "extractor": plan.get("x") or "generic",
+        "extractor_key": plan.get("k") or "Generic",
+        "duration": plan.get("d"),
+        "formats": formats,
+    }
@@ -0,0 +1,193 @@
+# core/engine/extraction_pool.py
+
+import atexit
+import concurrent.futures
+import multiprocessing
+import os
+import sys
+import threading
+from concurrent.futures.process import BrokenProcessPool
+
+EXTRACT_WORKERS = int(os.getenv("SAVIFYPRO_EXTRACT_WORKERS", str(min(4, os.cpu_count() or 1))))
+EXTRACT_MAX_QUEUE = int(os.getenv("SAVIFYPRO_EXTRACT_MAX_QUEUE", "64"))
+EXTRACT_MAX_TASKS_PER_WORKER = int(os.getenv("SAVIFYPRO_EXTRACT_MAX_TASKS", "50"))
+# a timed-out executor finishes the other jobs it holds for this long before its workers are killed
+EXTRACT_REAP_GRACE = float(os.getenv("SAVIFYPRO_EXTRACT_REAP_GRACE", "30"))
+EXTRACT_PRELOAD_MODULES = ["core.engine.metadata_extractor", "core.engine.playlist_extractor"]
+
+
+class ExtractionQueueFull(Exception):
+    pass
+
+
+class ExtractionTimeout(Exception):
+    pass
+
+
+class ExtractionPool:
+    """
+    Bounded pool of worker processes for CPU-heavy yt-dlp extraction.
+    Jobs beyond `max_queue` outstanding are rejected instead of queued
+    forever, and each worker is replaced after `max_tasks` jobs. A job
+    still running at its timeout cannot be cancelled, so its executor is
+    retired: new jobs go to a fresh one and the old workers are killed
+    once their other jobs finish.
+    """
+
+    def __init__(self, workers: int, max_queue: int, max_tasks: int):
+        self.workers = max(1, workers)
+        self.max_queue = max(self.workers, max_queue)
+        self.max_tasks = max_tasks
+        self._executor = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._live = {}  # executor -> futures not finished yet
+        self._counters = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "rejected": 0,
+            "timeouts": 0,
+            "restarts": 0,
+            "recycled": 0,
+        }
+
+    def _count(self, name: str):
+        with self._lock:
+            self._counters[name] += 1
+
+    def _context(self):
+        if not sys.platform.startswith("linux"):
+            return multiprocessing.get_context("spawn")
+        # the fork server imports yt-dlp once; recycled workers are cheap forks of it
+        ctx = multiprocessing.get_context("forkserver")
+        ctx.set_forkserver_preload(EXTRACT_PRELOAD_MODULES)
+        return ctx
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                kwargs = {"max_workers": self.workers, "mp_context": self._context()}
+                if self.max_tasks and sys.version_info >= (3, 11):
+                    kwargs["max_tasks_per_child"] = self.max_tasks
+                self._executor = concurrent.futures.ProcessPoolExecutor(**kwargs)
+            return self._executor
+
+    def _reset_executor(self, broken):
+        with self._lock:
+            if self._executor is broken:
+                self._executor = None
+                self._counters["restarts"] += 1
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def _finished(self, executor, future):
+        with self._lock:
+            self._pending -= 1
+            live = self._live.get(executor)
+            if live is not None:
+                live.discard(future)
+                if not live:
+                    del self._live[executor]
+
+    def _submit(self, executor, fn, args):
+        future = executor.submit(fn, *args)
+        with self._lock:
+            self._live.setdefault(executor, set()).add(future)
+        # a job counts against max_queue until it really ends, not until its caller gives up
+        future.add_done_callback(lambda f: self._finished(executor, f))
+        return future
+
+    def _recycle(self, executor, stuck):
+        with self._lock:
+            if self._executor is not executor:
+                return
+            self._executor = None
+            self._counters["recycled"] += 1
+        print("[!] INFO: Extraction worker stuck past its timeout; recycling the extraction pool")
+        threading.Thread(target=self._reap, args=(executor, stuck), name="extract-reaper", daemon=True).start()
+
+    def _reap(self, executor, stuck):
+        with self._lock:
+            others = [f for f in self._live.get(executor, ()) if f is not stuck]
+        concurrent.futures.wait(others, timeout=EXTRACT_REAP_GRACE)
+        # no public API for this before 3.14; the stuck job's future fails with BrokenProcessPool
+        for proc in list((getattr(executor, "_processes", None) or {}).values()):
+            try:
+                proc.kill()
+            except Exception:
+                pass
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def start(self):
+        """Spin up the workers ahead of the first request."""
+        executor = self._get_executor()
+        for _ in range(self.workers):
+            executor.submit(os.getpid)
+
+    def run(self, fn, *args, timeout: float = None):
+        with self._lock:
+            if self._pending >= self.max_queue:
+                self._counters["rejected"] += 1
+                raise ExtractionQueueFull(f"{self._pending} extractions already queued")
+            self._pending += 1
+            self._counters["submitted"] += 1
+
+        executor = self._get_executor()
+        try:
+            try:
+                future = self._submit(executor, fn, args)
+            except BrokenProcessPool:
+                # a worker died since the last job: start over on a fresh executor
+                self._reset_executor(executor)
+                executor = self._get_executor()
+                future = self._submit(executor, fn, args)
+        except BaseException:
+            with self._lock:
+                self._pending -= 1
+            raise
+
+        try:
+            result = future.result(timeout=timeout)
+        except concurrent.futures.TimeoutError:
+            if not future.cancel():
+                self._recycle(executor, future)
+            self._count("timeouts")
+            raise ExtractionTimeout(f"Extraction exceeded {timeout}s")
+        except BrokenProcessPool:
+            self._reset_executor(executor)
+            self._count("failed")
+            raise
+        except Exception:
+            self._count("failed")
+            raise
+
+        self._count("completed")
+        return result
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._counters)
+            stats.update({
+                "workers": self.workers,
+                "pending": self._pending,
+                "max_queue": self.max_queue,
+                "max_tasks_per_worker": self.max_tasks,
+                "started": self._executor is not None,
+            })
+        return stats
+
+
+# SAVIFYPRO_EXTRACT_WORKERS=0 keeps extraction in-process
+EXTRACTION_POOL = (
+    ExtractionPool(EXTRACT_WORKERS, EXTRACT_MAX_QUEUE, EXTRACT_MAX_TASKS_PER_WORKER)
+    if EXTRACT_WORKERS > 0 else None
+)
+
+if EXTRACTION_POOL:
+    atexit.register(EXTRACTION_POOL.shutdown)
@@ -0,0 +1,245 @@
+# core/engine/job_journal.py
+
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+
+from dir_setup import STATE_DIR
+
+JOURNAL_PATH = os.getenv("SAVIFYPRO_JOURNAL_PATH", os.path.join(STATE_DIR, "jobs.sqlite3"))
+# jobs older than this are not resumed (their source URLs and partials are long gone)
+JOURNAL_MAX_AGE = int(os.getenv("SAVIFYPRO_JOURNAL_MAX_AGE", str(24 * 60 * 60)))
+# a job that keeps dying with the process is given up after this many restarts
+JOURNAL_MAX_ATTEMPTS = int(os.getenv("SAVIFYPRO_JOURNAL_MAX_ATTEMPTS", "3"))
+# rows are leased to the worker running them; a lease not renewed for this long means the worker died
+JOURNAL_LEASE_SECONDS = int(os.getenv("SAVIFYPRO_JOURNAL_LEASE", "60"))
+JOURNAL_HEARTBEAT_SECONDS = JOURNAL_LEASE_SECONDS / 3
+
+# this process, as a lease holder; pids alone are reused across restarts
+WORKER_ID = f"{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+# the only request headers written to disk; cookies and auth tokens are never journaled,
+# so a resumed job falls back to the server-side cookie files for its platform
+JOURNAL_SAFE_HEADERS = frozenset({"user-agent", "referer", "accept-language"})
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id        TEXT PRIMARY KEY,
+    kind          TEXT NOT NULL,
+    url           TEXT NOT NULL,
+    params        TEXT NOT NULL,
+    download_ids  TEXT NOT NULL,
+    output_prefix TEXT,
+    attempts      INTEGER NOT NULL DEFAULT 0,
+    created_at    REAL NOT NULL,
+    updated_at    REAL NOT NULL,
+    owner         TEXT,
+    lease_until   REAL NOT NULL DEFAULT 0
+)
+"""
+
+
+def _safe_params(params: dict) -> dict:
+    headers = params.get("headers")
+    if not headers:
+        return params
+    kept = {k: v for k, v in headers.items() if k.lower() in JOURNAL_SAFE_HEADERS}
+    return {**params, "headers": kept or None}
+
+
+class JobJournal:
+    """
+    Unfinished downloads on disk. A row is written when a job is queued
+    and deleted when it reaches a final state, so whatever is left at
+    startup was interrupted by a restart and gets queued again.
+
+    Several workers may share the file: each row is leased to the worker
+    running it, renewed by a heartbeat, and only rows whose lease has
+    lapsed (or was released on a clean exit) are claimed for resuming.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(_SCHEMA)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        if "owner" not in columns:
+            # journals written before leases existed
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN lease_until REAL NOT NULL DEFAULT 0")
+        self._counters = {"recorded": 0, "finished": 0, "resumed": 0}
+        self._heartbeat = None
+
+    def _execute(self, sql: str, args=()):
+        with self._lock:
+            return self._conn.execute(sql, args).fetchall()
+
+    def record(self, job_id: str, kind: str, url: str, params: dict):
+        now = time.time()
+        # a resumed job keeps its row, attempt count and requesters
+        self._execute(
+            "INSERT INTO jobs (job_id, kind, url, params, download_ids, created_at, updated_at, owner, lease_until)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+            " ON CONFLICT(job_id) DO UPDATE SET updated_at = excluded.updated_at,"
+            " owner = excluded.owner, lease_until = excluded.lease_until",
+            (job_id, kind, url, json.dumps(_safe_params(params)), json.dumps([job_id]), now, now,
+             WORKER_ID, now + JOURNAL_LEASE_SECONDS),
+        )
+        self._count("recorded")
+        self._start_heartbeat()
+
+    def _start_heartbeat(self):
+        with self._lock:
+            if self._heartbeat is not None:
+                return
+            self._heartbeat = threading.Thread(target=self._renew_leases, name="journal-heartbeat", daemon=True)
+            self._heartbeat.start()
+        atexit.register(self.release_leases)
+
+    def _renew_leases(self):
+        while True:
+            time.sleep(JOURNAL_HEARTBEAT_SECONDS)
+            try:
+                self._execute(
+                    "UPDATE jobs SET lease_until = ? WHERE owner = ?",
+                    (time.time() + JOURNAL_LEASE_SECONDS, WORKER_ID),
+                )
+            except Exception:
+                traceback.print_exc()
+
+    def release_leases(self):
+        """Clean exit: hand this worker's rows to whichever worker starts next."""
+        try:
+            self._execute("UPDATE jobs SET owner = NULL, lease_until = 0 WHERE owner = ?", (WORKER_ID,))
+        except Exception:
+            pass
+
+    def _update_ids(self, job_id: str, fn):
+        with self._lock:
+            row = self._conn.execute("SELECT download_ids FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+            if row is None:
+                return
+            ids = fn(json.loads(row[0]))
+            self._conn.execute(
+                "UPDATE jobs SET download_ids = ?, updated_at = ? WHERE job_id = ?",
+                (json.dumps(ids), time.time(), job_id),
+            )
+
+    def attach(self, job_id: str, download_id: str):
+        self._update_ids(job_id, lambda ids: ids if download_id in ids else ids + [download_id])
+
+    def detach(self, job_id: str, download_id: str):
+        self._update_ids(job_id, lambda ids: [i for i in ids if i != download_id])
+
+    def rename(self, job_id: str, new_job_id: str):
+        """The job's original requester cancelled; the next one in line owns the row now."""
+        self._execute("UPDATE jobs SET job_id = ? WHERE job_id = ?", (new_job_id, job_id))
+
+    def set_output(self, job_id: str, output_prefix: str):
+        self._execute(
+            "UPDATE jobs SET output_prefix = ?, updated_at = ? WHERE job_id = ?",
+            (output_prefix, time.time(), job_id),
+        )
+
+    def finish(self, job_id: str):
+        self._execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+        self._count("finished")
+
+    def _count(self, name: str, n: int = 1):
+        with self._lock:
+            self._counters[name] += n
+
+    def unfinished(self) -> list:
+        """
+        Claim the rows no live worker holds, counting this as another
+        attempt. The claim is one UPDATE, so two workers starting together
+        never both get the same row; live siblings' rows are left alone.
+        """
+        now = time.time()
+        orphaned = "(owner IS NULL OR lease_until < ?)"
+        self._execute(
+            f"DELETE FROM jobs WHERE {orphaned} AND (updated_at < ? OR attempts >= ?)",
+            (now, now - JOURNAL_MAX_AGE, JOURNAL_MAX_ATTEMPTS),
+        )
+        self._execute(
+            f"UPDATE jobs SET owner = ?, lease_until = ?, attempts = attempts + 1 WHERE {orphaned}",
+            (WORKER_ID, now + JOURNAL_LEASE_SECONDS, now),
+        )
+        rows = self._execute(
+            "SELECT job_id, kind, url, params, download_ids, output_prefix, attempts FROM jobs"
+            " WHERE owner = ? ORDER BY created_at",
+            (WORKER_ID,),
+        )
+        if rows:
+            self._start_heartbeat()
+        return [
+            {
+                "job_id": job_id,
+                "kind": kind,
+                "url": url,
+                "params": json.loads(params),
+                "download_ids": json.loads(download_ids),
+                "output_prefix": output_prefix,
+                "attempts": attempts,
+            }
+            for job_id, kind, url, params, download_ids, output_prefix, attempts in rows
+        ]
+
+    def stats(self) -> dict:
+        pending = self._execute("SELECT COUNT(*) FROM jobs")[0][0]
+        owned = self._execute("SELECT COUNT(*) FROM jobs WHERE owner = ?", (WORKER_ID,))[0][0]
+        with self._lock:
+            stats = dict(self._counters)
+        stats["pending"] = pending
+        stats["owned"] = owned
+        stats["worker"] = WORKER_ID
+        return stats
+
+
+JOURNAL = JobJournal(JOURNAL_PATH)
+
+
+def resume_unfinished_jobs() -> int:
+    """Queue again every job the previous process did not finish, under its old download_ids."""
+    from core.engine.audio_downloader import start_audio_download
+    from core.engine.video_downloader import start_download
+
+    resumed = 0
+    for row in JOURNAL.unfinished():
+        params = row["params"]
+        ids = row["download_ids"]
+        if not ids:
+            # every requester cancelled before the restart
+            JOURNAL.finish(row["job_id"])
+            continue
+        if ids[0] != row["job_id"]:
+            JOURNAL.rename(row["job_id"], ids[0])
+
+        # the first id recreates the job, later ones attach to it like live duplicates
+        for download_id in ids:
+            try:
+                if row["kind"] == "video":
+                    start_download(row["url"], download_id=download_id, **params)
+                else:
+                    start_audio_download(row["url"], download_id=download_id, **params)
+            except Exception:
+                traceback.print_exc()
+                break
+        resumed += 1
+
+    JOURNAL._count("resumed", resumed)
+    if resumed:
+        print(f"[!] INFO: Resumed {resumed} unfinished downloads from the job journal")
+    return resumed
+
+
+def get_journal_stats():
+    return JOURNAL.stats()
@@ -0,0 +1,187 @@
+# core/engine/job_scheduler.py
+
+import bisect
+import itertools
+import os
+import threading
+import time
+import traceback
+
+from core.engine.download_jobs import primary_download_id
+from utils.status_manager import update_status
+
+DOWNLOAD_WORKERS = int(os.getenv("SAVIFYPRO_DOWNLOAD_WORKERS", str(max(2, min(8, os.cpu_count() or 2)))))
+DOWNLOAD_MAX_QUEUE = int(os.getenv("SAVIFYPRO_DOWNLOAD_MAX_QUEUE", "1000"))
+DEFAULT_PLATFORM_CAP = int(os.getenv("SAVIFYPRO_PLATFORM_CAP", "4"))
+
+# Lower runs first
+PRIORITY_AUDIO = 0
+PRIORITY_SHORT_VIDEO = 1
+PRIORITY_VIDEO = 2
+SHORT_VIDEO_SECONDS = 5 * 60
+
+
+def _parse_caps(raw: str) -> dict:
+    """SAVIFYPRO_PLATFORM_CAPS="youtube=3,tiktok=6" """
+    caps = {}
+    for part in raw.split(","):
+        name, _, value = part.partition("=")
+        if name.strip() and value.strip().isdigit():
+            caps[name.strip().lower()] = int(value)
+    return caps
+
+
+PLATFORM_CAPS = _parse_caps(os.getenv("SAVIFYPRO_PLATFORM_CAPS", ""))
+
+
+def video_priority(duration) -> int:
+    if duration and duration <= SHORT_VIDEO_SECONDS:
+        return PRIORITY_SHORT_VIDEO
+    return PRIORITY_VIDEO
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+class _Job:
+    __slots__ = ("sort_key", "download_id", "fn", "platform", "publish", "enqueued_at")
+
+    def __init__(self, sort_key, download_id, fn, platform, publish):
+        self.sort_key = sort_key
+        self.download_id = download_id
+        self.fn = fn
+        self.platform = platform
+        self.publish = publish
+        self.enqueued_at = time.time()
+
+    def __lt__(self, other):
+        return self.sort_key < other.sort_key
+
+
+class DownloadScheduler:
+    """
+    Fixed pool of download workers fed from a priority queue. A job only
+    starts when its platform is below its concurrency cap; queued jobs of
+    other platforms may overtake it meanwhile.
+    """
+
+    def __init__(self, workers: int, max_queue: int, platform_caps: dict, default_cap: int):
+        self.workers = max(1, workers)
+        self.max_queue = max_queue
+        self.platform_caps = platform_caps
+        self.default_cap = max(1, default_cap)
+        self._queue = []
+        self._active = {}
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._threads = []
+        self._counters = {"submitted": 0, "started": 0, "completed": 0, "failed": 0, "rejected": 0, "cancelled": 0}
+
+    def _cap(self, platform: str) -> int:
+        return self.platform_caps.get(platform, self.default_cap)
+
+    def _ensure_workers(self):
+        if self._threads:
+            return
+        for i in range(self.workers):
+            t = threading.Thread(target=self._worker, name=f"download-worker-{i}", daemon=True)
+            self._threads.append(t)
+            t.start()
+
+    def submit(self, download_id: str, fn, platform: str = "unknown", priority: int = PRIORITY_VIDEO, publish=None) -> int:
+        """
+        Queue `fn` for a worker; returns the initial queue position (1-based).
+        `publish` receives the scheduler's status updates (defaults to
+        update_status for `download_id`).
+        """
+        if publish is None:
+            publish = lambda data: update_status(download_id, data)
+        job = _Job((priority, next(self._seq)), download_id, fn, platform or "unknown", publish)
+        with self._cond:
+            if len(self._queue) >= self.max_queue:
+                self._counters["rejected"] += 1
+                raise JobQueueFull(f"{len(self._queue)} downloads already queued")
+            bisect.insort(self._queue, job)
+            position = self._queue.index(job) + 1
+            self._counters["submitted"] += 1
+            # published before any worker can pick the job up and report "starting"
+            publish({"status": "queued", "progress": 0, "queue_position": position})
+            self._ensure_workers()
+            self._cond.notify()
+        return position
+
+    def _next_runnable(self):
+        for i, job in enumerate(self._queue):
+            if self._active.get(job.platform, 0) < self._cap(job.platform):
+                return self._queue.pop(i)
+        return None
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                job = self._next_runnable()
+                while job is None:
+                    self._cond.wait()
+                    job = self._next_runnable()
+                self._active[job.platform] = self._active.get(job.platform, 0) + 1
+                self._counters["started"] += 1
+
+            job.publish({"queue_position": None})
+            failed = False
+            try:
+                job.fn()
+            except Exception:
+                failed = True
+                traceback.print_exc()
+            finally:
+                with self._cond:
+                    self._active[job.platform] -= 1
+                    if not self._active[job.platform]:
+                        del self._active[job.platform]
+                    self._counters["failed" if failed else "completed"] += 1
+                    # a freed platform slot can unblock any waiting worker
+                    self._cond.notify_all()
+
+    def cancel(self, download_id: str) -> bool:
+        """Drop a job that has not started yet. False once a worker picked it up."""
+        with self._cond:
+            for i, job in enumerate(self._queue):
+                if job.download_id == download_id:
+                    del self._queue[i]
+                    self._counters["cancelled"] += 1
+                    return True
+        return False
+
+    def queue_position(self, download_id: str):
+        with self._cond:
+            for i, job in enumerate(self._queue):
+                if job.download_id == download_id:
+                    return i + 1
+        return None
+
+    def stats(self) -> dict:
+        with self._cond:
+            stats = dict(self._counters)
+            stats.update({
+                "workers": self.workers,
+                "busy": sum(self._active.values()),
+                "queued": len(self._queue),
+                "max_queue": self.max_queue,
+                "active_by_platform": dict(self._active),
+                "platform_caps": dict(self.platform_caps),
+                "default_platform_cap": self.default_cap,
+            })
+        return stats
+
+
+SCHEDULER = DownloadScheduler(DOWNLOAD_WORKERS, DOWNLOAD_MAX_QUEUE, PLATFORM_CAPS, DEFAULT_PLATFORM_CAP)
+
+
+def get_queue_position(download_id: str):
+    # requests attached to a shared download wait in the queue under its id
+    return SCHEDULER.queue_position(primary_download_id(download_id))
+
+
+def get_scheduler_stats():
+    return SCHEDULER.stats()
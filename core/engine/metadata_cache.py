@@ -0,0 +1,232 @@
+# core/engine/metadata_cache.py
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import parse_qs, urlparse
+
+from utils.state_backend import SHARED_STATE
+
+CACHE_MAX_ENTRIES = int(os.getenv("SAVIFYPRO_CACHE_MAX_ENTRIES", "512"))
+CACHE_DEFAULT_TTL = int(os.getenv("SAVIFYPRO_CACHE_TTL", str(6 * 60 * 60)))  # 6 hours
+CACHE_EXPIRY_MARGIN = 5 * 60  # drop entries 5 minutes before their stream links die
+
+_EXPIRE_PATH_RE = re.compile(r"/expire/(\d+)")
+
+
+def cache_key(value: str) -> str:
+    """Content-stable key: identical across restarts and worker processes."""
+    return hashlib.sha256(value.strip().encode("utf-8")).hexdigest()[:40]
+
+
+def _url_expiry(url: str):
+    if not url:
+        return None
+    try:
+        query = parse_qs(urlparse(url).query)
+        expire = query.get("expire") or query.get("Expires")
+        if expire:
+            return int(expire[0])
+        if query.get("oe"):
+            # Facebook/Instagram CDNs encode the expiry as hex
+            return int(query["oe"][0], 16)
+        m = _EXPIRE_PATH_RE.search(url)
+        if m:
+            return int(m.group(1))
+    except (ValueError, TypeError):
+        pass
+    return None
+
+
+def stream_expiry(formats) -> int | None:
+    """Earliest `expire` timestamp found in the stream URLs of `formats`."""
+    earliest = None
+    for f in formats or []:
+        ts = _url_expiry(f.get("url")) or _url_expiry(f.get("manifest_url"))
+        if ts and (earliest is None or ts < earliest):
+            earliest = ts
+    return earliest
+
+
+class MetadataCache:
+    """
+    Two-tier cache: a bounded LRU dict in memory in front of compact JSON
+    files on disk, or of the shared state backend when one is configured
+    (one namespace per cache). Every entry carries its own absolute expiry.
+    """
+
+    def __init__(self, directory: str, max_entries: int = CACHE_MAX_ENTRIES, default_ttl: int = CACHE_DEFAULT_TTL):
+        self.directory = directory
+        self.max_entries = max(1, max_entries)
+        self.default_ttl = default_ttl
+        self.shared = SHARED_STATE if SHARED_STATE.shared else None
+        self.namespace = f"metadata:{os.path.basename(os.path.normpath(directory))}"
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "shared_hits": 0,
+            "misses": 0,
+            "expired": 0,
+            "evictions": 0,
+            "writes": 0,
+        }
+
+    # ---------------- HELPERS ----------------
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _count(self, name: str):
+        with self._lock:
+            self._counters[name] += 1
+
+    def _remember(self, key: str, expires_at: float, value: dict):
+        with self._lock:
+            self._memory[key] = (expires_at, value)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+                self._counters["evictions"] += 1
+
+    def expiry_for(self, formats=None) -> float:
+        """Absolute expiry: the default TTL, cut short by the earliest stream `expire`."""
+        now = time.time()
+        expires_at = now + self.default_ttl
+        stream_expires = stream_expiry(formats)
+        if stream_expires:
+            expires_at = min(expires_at, stream_expires - CACHE_EXPIRY_MARGIN)
+        return expires_at
+
+    # ---------------- PUBLIC API ----------------
+
+    def get(self, key: str):
+        now = time.time()
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self._counters["memory_hits"] += 1
+                    return value
+                del self._memory[key]
+                self._counters["expired"] += 1
+
+        if self.shared:
+            stored = self.shared.get(self.namespace, key)
+            if not stored or stored.get("e", 0) <= now:
+                self._count("misses")
+                return None
+            self._remember(key, stored["e"], stored["v"])
+            self._count("shared_hits")
+            return stored["v"]
+
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                stored = json.load(f)
+            expires_at = stored["e"]
+            value = stored["v"]
+        except FileNotFoundError:
+            self._count("misses")
+            return None
+        except (ValueError, KeyError, TypeError, OSError):
+            self._discard_file(path)
+            self._count("misses")
+            return None
+
+        if expires_at <= now:
+            self._discard_file(path)
+            self._count("expired")
+            self._count("misses")
+            return None
+
+        self._remember(key, expires_at, value)
+        self._count("disk_hits")
+        return value
+
+    def set(self, key: str, value: dict, expires_at: float = None):
+        expires_at = expires_at or time.time() + self.default_ttl
+        if expires_at <= time.time():
+            return
+        self._remember(key, expires_at, value)
+
+        if self.shared:
+            self.shared.set(self.namespace, key, {"e": expires_at, "v": value}, expires_at - time.time())
+            self._count("writes")
+            return
+
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"e": expires_at, "v": value}, f, separators=(",", ":"), ensure_ascii=False)
+            os.replace(tmp_path, path)
+            self._count("writes")
+        except (OSError, TypeError, ValueError):
+            self._discard_file(tmp_path)
+
+    def invalidate(self, key: str):
+        with self._lock:
+            self._memory.pop(key, None)
+        if self.shared:
+            self.shared.delete(self.namespace, key)
+        self._discard_file(self._path(key))
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._counters)
+            stats["memory_entries"] = len(self._memory)
+            stats["max_entries"] = self.max_entries
+        hits = stats["memory_hits"] + stats["disk_hits"] + stats["shared_hits"]
+        lookups = hits + stats["misses"]
+        stats["hit_ratio"] = round(hits / lookups, 4) if lookups else 0.0
+        return stats
+
+    @staticmethod
+    def _discard_file(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def purge_expired_entries(directory: str) -> int:
+    """
+    Delete the on-disk entries under `directory` (sub-caches included)
+    whose expiry has passed, plus unreadable ones and stray temp files.
+    Live entries are left alone so they survive restarts.
+    """
+    now = time.time()
+    removed = 0
+    for root, _, files in os.walk(directory):
+        for name in files:
+            path = os.path.join(root, name)
+            if name.endswith(".tmp"):
+                # a writer that died mid-write; live ones replace theirs within moments
+                try:
+                    stale = os.path.getmtime(path) < now - CACHE_EXPIRY_MARGIN
+                except OSError:
+                    continue
+            elif name.endswith(".json"):
+                try:
+                    with open(path, "r", encoding="utf-8") as f:
+                        stale = json.load(f)["e"] <= now
+                except FileNotFoundError:
+                    continue
+                except (ValueError, KeyError, TypeError, OSError):
+                    stale = True
+            else:
+                continue
+            if stale:
+                MetadataCache._discard_file(path)
+                removed += 1
+    return removed
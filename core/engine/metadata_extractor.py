@@ -1,55 +1,182 @@
 # core/engine/metadata_extractor.py
 
+import copy
 import os
-import json
 import threading
 import uuid
+from concurrent.futures.process import BrokenProcessPool
 import yt_dlp
-import time
-from pathlib import Path
 
 from dir_setup import METADATA_DIR
+from core.engine.download_plan import load_plan, sign_plan
+from core.engine.extraction_pool import EXTRACTION_POOL, ExtractionQueueFull, ExtractionTimeout
+from core.engine.metadata_cache import MetadataCache, cache_key
+from core.engine.single_flight import FlightCancelled, FlightTimeout, SingleFlight
+from core.engine.ydl_pool import YDL_POOLS
 from utils.file_extensions import AUDIO_FORMATS, VIDEO_FORMATS
 from advanced.anti_blocker import GLOBAL_PROXY
 from utils.cookie_loader import prepare_cookie_file
-from utils.platform_detector import detect_platform, merge_headers_with_cookie
+from utils.platform_detector import detect_platform, media_key, merge_headers_with_cookie
 from utils.status_manager import update_status
 
-PROCESS_CACHE = {}
+EXTRACT_WAIT_TIMEOUT = float(os.getenv("SAVIFYPRO_EXTRACT_TIMEOUT", "60"))
+
+# Heavy fields the downloaders never need from a cached info dict
+_INFO_DROP_KEYS = {"automatic_captions", "subtitles", "thumbnails", "heatmap", "requested_subtitles"}
+
+PROCESS_CACHE = MetadataCache(METADATA_DIR)
+INFO_CACHE = MetadataCache(os.path.join(METADATA_DIR, "info"), max_entries=64)
+_inflight = SingleFlight("extract")
+# download_id -> cancel Event, only while that caller waits on an extraction
 _download_locks = {}
+_cancel_lock = threading.Lock()
+
+
+class ExtractionError(Exception):
+    def __init__(self, message: str, detail: str = None):
+        super().__init__(message)
+        self.message = message
+        self.detail = detail or message
+
+    def __reduce__(self):
+        # keep `detail` when raised inside an extraction worker process
+        return (ExtractionError, (self.message, self.detail))
+
+
+def _key(url):
+    # youtu.be/X, watch?v=X&si=... and shorts/X all share one entry
+    return cache_key(media_key(url))
+
+def get_extractor_stats():
+    return {
+        "cache": PROCESS_CACHE.stats(),
+        "info_cache": INFO_CACHE.stats(),
+        "inflight": _inflight.stats(),
+        "pool": EXTRACTION_POOL.stats() if EXTRACTION_POOL else None,
+    }
+
+def cancel_extraction(download_id):
+    """Stop waiting on an extraction. The shared flight itself keeps running for other callers."""
+    with _cancel_lock:
+        event = _download_locks.get(download_id)
+    if event is None:
+        return False
+    event.set()
+    return True
+
+def pending_extractions():
+    with _cancel_lock:
+        return len(_download_locks)
+
+def get_cached_info(url):
+    """
+    Private copy of the info dict extracted by /api/fetch, ready for
+    YoutubeDL.process_ie_result. None when it is missing or expired.
+    """
+    info = INFO_CACHE.get(_key(url))
+    return copy.deepcopy(info) if info else None
 
-def _cache_path(url: str):
-    safe = str(abs(hash(url)))
-    return os.path.join(METADATA_DIR, f"{safe}.json")
+def _slim_info(info):
+    return {k: v for k, v in yt_dlp.YoutubeDL.sanitize_info(info, remove_private_keys=True).items()
+            if k not in _INFO_DROP_KEYS}
 
-def extract_metadata(url, headers=None, download_id=None):
-    start = time.time()
+def get_cached_duration(url):
+    """Duration from the cached info dict without copying it (None if unknown)."""
+    info = INFO_CACHE.get(_key(url))
+    return info.get("duration") if info else None
+
+def get_cached_title(url):
+    """Title from the cached info dict without copying it (None if unknown)."""
+    info = INFO_CACHE.get(_key(url))
+    return info.get("title") if info else None
+
+def remember_info(url, info, expires_at=None, slim=False):
+    """Keep a sanitized info dict so later downloads can skip extraction."""
+    if not isinstance(info, dict) or not info.get("formats"):
+        return
+    if not slim:
+        info = _slim_info(info)
+    INFO_CACHE.set(_key(url), info, expires_at or INFO_CACHE.expiry_for(info.get("formats")))
+
+def get_cached_metadata(url, download_id=None):
+    """Answer from the metadata cache only; None on a miss."""
+    cached = PROCESS_CACHE.get(_key(url))
+    if not cached:
+        return None
+    download_id = download_id or str(uuid.uuid4())
+    result = cached.copy()
+    result["download_id"] = download_id
+    update_status(download_id, {"status": "ready", "cached": True})
+    return result
+
+def extract_metadata(url, headers=None, download_id=None, timeout=EXTRACT_WAIT_TIMEOUT):
     download_id = download_id or str(uuid.uuid4())
+    key = _key(url)
 
-    if url in PROCESS_CACHE:
-        result = PROCESS_CACHE[url].copy()
-        result["download_id"] = download_id
-        update_status(download_id, {"status": "ready", "cached": True})
-        return result
-
-    cache_file = _cache_path(url)
-    if os.path.exists(cache_file):
-        try:
-            with open(cache_file, "r", encoding="utf-8") as f:
-                cached = json.load(f)
-            PROCESS_CACHE[url] = cached
-            cached = cached.copy()
-            cached["download_id"] = download_id
-            update_status(download_id, {"status": "ready", "cached": True})
-            return cached
-        except:
-            pass
+    cached = get_cached_metadata(url, download_id)
+    if cached:
+        return cached
 
     cancel_event = threading.Event()
-    _download_locks[download_id] = cancel_event
+    with _cancel_lock:
+        _download_locks[download_id] = cancel_event
 
     update_status(download_id, {"status": "extracting", "progress": 0})
 
+    # Concurrent callers for the same key share one extraction
+    try:
+        result = _inflight.do(
+            key,
+            lambda: _extract(url, headers, key),
+            timeout=timeout,
+            cancel_event=cancel_event
+        )
+    except FlightTimeout:
+        update_status(download_id, {"status": "error", "error": "Extraction timed out"})
+        return {"error": "Extraction timed out", "download_id": download_id}
+    except FlightCancelled:
+        update_status(download_id, {"status": "canceled"})
+        return {"error": "Extraction cancelled", "download_id": download_id}
+    except ExtractionError as e:
+        update_status(download_id, {"status": "error", "error": e.detail})
+        return {"error": e.message, "download_id": download_id}
+    finally:
+        with _cancel_lock:
+            _download_locks.pop(download_id, None)
+
+    result = result.copy()
+    result["download_id"] = download_id
+    update_status(download_id, {"status": "ready"})
+    return result
+
+def _extract(url, headers, key):
+    """Runs once per flight: extraction in the worker pool, caching here."""
+    try:
+        if EXTRACTION_POOL:
+            result, info, offered = EXTRACTION_POOL.run(_extract_in_worker, url, headers, timeout=EXTRACT_WAIT_TIMEOUT)
+        else:
+            result, info, offered = _extract_in_worker(url, headers)
+    except ExtractionQueueFull:
+        raise ExtractionError("Server is busy, please try again shortly")
+    except ExtractionTimeout as e:
+        raise ExtractionError("Extraction timed out", str(e))
+    except BrokenProcessPool as e:
+        # the pool replaces the executor; the next request gets fresh workers
+        raise ExtractionError("Extraction worker crashed, please try again", str(e) or "broken process pool")
+
+    # Plans are signed here so every worker process shares one signing key
+    expires_at = PROCESS_CACHE.expiry_for(info.get("formats"))
+    result["plan"] = sign_plan(url, info, offered, expires_at)
+
+    remember_info(url, info, expires_at, slim=True)
+    PROCESS_CACHE.set(key, result, expires_at)
+    return result
+
+def _extract_in_worker(url, headers):
+    """
+    Blocking yt-dlp extraction, safe to run in a pool process.
+    Returns (result, slim info, offered format_ids).
+    """
     platform = detect_platform(url)
     merged_headers = merge_headers_with_cookie(headers or {}, platform)
     cookie_file = prepare_cookie_file(headers, platform)
@@ -69,9 +196,6 @@ def extract_metadata(url, headers=None, download_id=None):
         "http_headers": merged_headers,
         "skip_unavailable_fragments": True,
         "concurrent_fragment_downloads": 1,
-        "progress_hooks": [
-            lambda _: cancel_event.is_set() and (_ for _ in ()).throw(Exception("Cancelled"))
-        ],
         "extractor_args": {
             "youtube": {"skip": ["dash", "translated_subs", "hls"]},
             "tiktok": {"api_hostname": ["api16-normal-c-useast1a"]},
@@ -84,15 +208,13 @@ def extract_metadata(url, headers=None, download_id=None):
         ydl_opts["proxy"] = GLOBAL_PROXY
 
     try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        with YDL_POOLS.checkout("metadata", ydl_opts) as ydl:
             info = ydl.extract_info(url, download=False)
     except Exception as e:
-        update_status(download_id, {"status": "error", "error": str(e)})
-        return {"error": "Extraction failed", "download_id": download_id}
+        raise ExtractionError("Extraction failed", str(e))
 
     if not info or "formats" not in info:
-        update_status(download_id, {"status": "error", "error": "No metadata"})
-        return {"error": "No metadata", "download_id": download_id}
+        raise ExtractionError("No metadata")
 
     formats = info.get("formats") or []
     duration = info.get("duration") or 0
@@ -168,7 +290,6 @@ def extract_metadata(url, headers=None, download_id=None):
         })
 
     result = {
-        "download_id": download_id,
         "platform": platform,
         "title": info.get("title"),
         "webpage_url": info.get("webpage_url"),
@@ -179,13 +300,37 @@ def extract_metadata(url, headers=None, download_id=None):
         "url": url,
     }
 
-    PROCESS_CACHE[url] = result.copy()
-    Path(METADATA_DIR).mkdir(parents=True, exist_ok=True)
-    try:
-        with open(cache_file, "w", encoding="utf-8") as f:
-            json.dump(result, f, indent=2)
-    except:
-        pass
+    offered = [a["format_id"] for a in audio_out.values()] + [v["format_id"] for v in video_out]
+    return result, _slim_info(info), offered
 
-    update_status(download_id, {"status": "ready"})
-    return result
+def resolve_download_info(url, plan=None, headers=None, cookie_file=None):
+    """
+    Info dict for a download, cheapest source first: the /api/fetch cache,
+    a signed download plan, then a single unprocessed extraction.
+    Returns (info, source).
+    """
+    info = get_cached_info(url)
+    if info:
+        return info, "cache"
+
+    info = load_plan(plan, url)
+    if info:
+        return info, "plan"
+
+    ydl_opts = {
+        "quiet": True,
+        "no_warnings": True,
+        "skip_download": True,
+        "noplaylist": True,
+        "http_headers": headers or {},
+    }
+    if cookie_file:
+        ydl_opts["cookiefile"] = cookie_file
+    if GLOBAL_PROXY:
+        ydl_opts["proxy"] = GLOBAL_PROXY
+
+    with YDL_POOLS.checkout("probe", ydl_opts) as ydl:
+        info = ydl.extract_info(url, download=False, process=False)
+
+    remember_info(url, info)
+    return info, "extracted"
@@ -0,0 +1,239 @@
+# core/engine/passthrough.py
+
+import asyncio
+import os
+import re
+import signal
+import sys
+import threading
+
+from advanced.anti_blocker import GLOBAL_PROXY
+from utils.cookie_loader import TEMP_COOKIE_SUFFIX, prepare_cookie_file
+from utils.filename_generator import generate_audio_filename, generate_video_filename
+from utils.platform_detector import detect_platform, merge_headers_with_cookie
+
+STREAM_MAX_CONCURRENT = int(os.getenv("SAVIFYPRO_STREAM_MAX", "8"))
+STREAM_START_TIMEOUT = float(os.getenv("SAVIFYPRO_STREAM_START_TIMEOUT", "60"))
+STREAM_CHUNK_SIZE = 64 * 1024
+_STDERR_LIMIT = 8 * 1024
+
+
+class PassthroughBusy(Exception):
+    pass
+
+
+class PassthroughError(Exception):
+    pass
+
+
+class _Slots:
+    def __init__(self, limit: int):
+        self.limit = max(1, limit)
+        self._lock = threading.Lock()
+        self._counters = {"active": 0, "started": 0, "completed": 0, "failed": 0, "rejected": 0, "bytes": 0}
+
+    def acquire(self):
+        with self._lock:
+            if self._counters["active"] >= self.limit:
+                self._counters["rejected"] += 1
+                raise PassthroughBusy(f"{self.limit} streams already running")
+            self._counters["active"] += 1
+            self._counters["started"] += 1
+
+    def release(self, outcome: str, sent: int):
+        with self._lock:
+            self._counters["active"] -= 1
+            self._counters[outcome] += 1
+            self._counters["bytes"] += sent
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._counters, "limit": self.limit}
+
+
+_SLOTS = _Slots(STREAM_MAX_CONCURRENT)
+
+
+def _ytdlp_cmd(url: str, format_selector: str, headers: dict, cookie_file: str) -> list:
+    cmd = [
+        sys.executable, "-m", "yt_dlp",
+        "--quiet", "--no-warnings", "--no-playlist", "--no-part",
+        "-f", format_selector,
+        "-o", "-",
+    ]
+    for name, value in headers.items():
+        if name.lower() != "cookie":
+            cmd += ["--add-header", f"{name}:{value}"]
+    if cookie_file:
+        cmd += ["--cookies", cookie_file]
+    if GLOBAL_PROXY:
+        cmd += ["--proxy", GLOBAL_PROXY]
+    return cmd + ["--", url]
+
+
+def _ffmpeg_cmd(kind: str, bitrate: str) -> list:
+    cmd = ["ffmpeg", "-hide_banner", "-loglevel", "error", "-i", "pipe:0"]
+    if kind == "audio":
+        cmd += ["-vn", "-c:a", "libmp3lame", "-b:a", f"{bitrate}k", "-f", "mp3"]
+    else:
+        # a pipe cannot be seeked back to write the moov box, so fragment the output
+        cmd += ["-c", "copy", "-movflags", "frag_keyframe+empty_moov+default_base_moof", "-f", "mp4"]
+    return cmd + ["pipe:1"]
+
+
+async def _drain(stream, sink: bytearray):
+    while True:
+        chunk = await stream.read(4096)
+        if not chunk:
+            return
+        if len(sink) < _STDERR_LIMIT:
+            sink.extend(chunk[:_STDERR_LIMIT - len(sink)])
+
+
+def _remove_cookie_file(cookie_file):
+    if cookie_file and cookie_file.endswith(TEMP_COOKIE_SUFFIX):
+        try:
+            os.remove(cookie_file)
+        except OSError:
+            pass
+
+
+async def _kill(proc):
+    # the whole group: yt-dlp may have spawned its own ffmpeg, which holds our pipes open
+    try:
+        if hasattr(os, "killpg"):
+            os.killpg(proc.pid, signal.SIGKILL)
+        elif proc.returncode is None:
+            proc.kill()
+    except OSError:
+        # ProcessLookupError: the group already exited
+        pass
+    await proc.wait()
+
+
+async def open_stream(url: str, kind: str = "video", quality: str = "720p", bitrate: str = "192", headers: dict = None):
+    """
+    Start yt-dlp writing to stdout piped straight into ffmpeg, and wait for
+    the first output bytes. Returns (media_type, filename, body, close):
+    body is an async iterator, nothing touches the disk and a slow client
+    stalls both processes through the pipe buffers. `close` kills the
+    children and frees the slot; it is idempotent and must be run once the
+    response is over (body does it itself when it is iterated, and an
+    unread body is closed after STREAM_START_TIMEOUT).
+    """
+    from core.engine.metadata_extractor import get_cached_title
+
+    # the info cache may live in SQLite or Redis
+    title = await asyncio.to_thread(get_cached_title, url)
+    if kind == "audio":
+        bitrate = re.sub(r"[^0-9]", "", str(bitrate)) or "192"
+        format_selector = "bestaudio/best"
+        media_type = "audio/mpeg"
+        filename = f"{generate_audio_filename(title or 'audio')}.mp3"
+    else:
+        height = re.sub(r"[^0-9]", "", str(quality)) or "720"
+        # one pre-muxed stream: a merge needs both inputs on disk
+        format_selector = f"best[ext=mp4][height<={height}]/best[height<={height}]/best"
+        media_type = "video/mp4"
+        filename = generate_video_filename(title or "video", f"{height}p")
+
+    _SLOTS.acquire()
+    cookie_file = None
+    try:
+        platform = detect_platform(url)
+        merged_headers = merge_headers_with_cookie(headers or {}, platform)
+        cookie_file = prepare_cookie_file(headers, platform)
+        read_fd, write_fd = os.pipe()
+    except BaseException:
+        # bad cookie file, out of descriptors...: the slot must not leak
+        _remove_cookie_file(cookie_file)
+        _SLOTS.release("failed", 0)
+        raise
+
+    procs = []
+    stderr = bytearray()
+    try:
+        ydl = await asyncio.create_subprocess_exec(
+            *_ytdlp_cmd(url, format_selector, merged_headers, cookie_file),
+            stdin=asyncio.subprocess.DEVNULL, stdout=write_fd, stderr=asyncio.subprocess.PIPE,
+            start_new_session=True,
+        )
+        procs.append(ydl)
+        ffmpeg = await asyncio.create_subprocess_exec(
+            *_ffmpeg_cmd(kind, bitrate),
+            stdin=read_fd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL,
+            start_new_session=True,
+        )
+        procs.append(ffmpeg)
+    except BaseException:
+        _SLOTS.release("failed", 0)
+        _remove_cookie_file(cookie_file)
+        for proc in procs:
+            await _kill(proc)
+        raise
+    finally:
+        # the children hold their own copies
+        os.close(read_fd)
+        os.close(write_fd)
+
+    drain = asyncio.create_task(_drain(ydl.stderr, stderr))
+
+    async def kill_children():
+        for proc in (ydl, ffmpeg):
+            await _kill(proc)
+        try:
+            # let the error message land before it is read
+            await asyncio.wait_for(drain, 1)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            pass
+        _remove_cookie_file(cookie_file)
+
+    try:
+        first = await asyncio.wait_for(ffmpeg.stdout.read(STREAM_CHUNK_SIZE), STREAM_START_TIMEOUT)
+    except asyncio.TimeoutError:
+        first = b""
+    except BaseException:
+        # the request was cancelled while waiting: free the slot before anything else can be interrupted
+        _SLOTS.release("failed", 0)
+        await kill_children()
+        raise
+    if not first:
+        await kill_children()
+        _SLOTS.release("failed", 0)
+        detail = stderr.decode("utf-8", "replace").strip().splitlines()
+        raise PassthroughError(detail[-1] if detail else "Stream produced no data")
+
+    state = {"started": False, "closed": False, "sent": 0, "outcome": "failed"}
+
+    async def close():
+        if state["closed"]:
+            return
+        state["closed"] = True
+        await kill_children()
+        _SLOTS.release(state["outcome"], state["sent"])
+
+    async def body():
+        state["started"] = True
+        try:
+            chunk = first
+            while chunk:
+                yield chunk
+                state["sent"] += len(chunk)
+                chunk = await ffmpeg.stdout.read(STREAM_CHUNK_SIZE)
+            await ffmpeg.wait()
+            state["outcome"] = "completed" if ffmpeg.returncode == 0 else "failed"
+        finally:
+            # client went away or the pipeline ended: never leave children behind
+            await close()
+
+    def close_unread():
+        # the response was never sent, so body's finally will never run
+        if not state["started"]:
+            asyncio.ensure_future(close())
+
+    asyncio.get_running_loop().call_later(STREAM_START_TIMEOUT, close_unread)
+    return media_type, filename, body(), close
+
+
+def get_passthrough_stats():
+    return _SLOTS.stats()
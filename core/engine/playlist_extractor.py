@@ -0,0 +1,163 @@
+# core/engine/playlist_extractor.py
+
+import base64
+import os
+from concurrent.futures.process import BrokenProcessPool
+
+from dir_setup import METADATA_DIR
+from advanced.anti_blocker import GLOBAL_PROXY
+from core.engine.extraction_pool import EXTRACTION_POOL, ExtractionQueueFull, ExtractionTimeout
+from core.engine.metadata_cache import MetadataCache, cache_key
+from core.engine.single_flight import FlightTimeout, SingleFlight
+from core.engine.ydl_pool import YDL_POOLS
+from utils.cookie_loader import prepare_cookie_file
+from utils.platform_detector import detect_platform, merge_headers_with_cookie, normalize_url
+
+PLAYLIST_PAGE_SIZE = 50
+PLAYLIST_MAX_PAGE_SIZE = 200
+PLAYLIST_TIMEOUT = float(os.getenv("SAVIFYPRO_PLAYLIST_TIMEOUT", "60"))
+
+# Flat entries carry no stream URLs, so a short fixed TTL is enough
+PLAYLIST_CACHE = MetadataCache(os.path.join(METADATA_DIR, "playlists"), max_entries=128, default_ttl=10 * 60)
+_inflight = SingleFlight("playlist")
+
+
+def encode_cursor(offset: int) -> str:
+    return base64.urlsafe_b64encode(f"o:{offset}".encode("ascii")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    if not cursor:
+        return 0
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("ascii")
+        prefix, offset = raw.split(":", 1)
+        if prefix == "o" and int(offset) >= 0:
+            return int(offset)
+    except (ValueError, UnicodeDecodeError):
+        pass
+    raise ValueError("Invalid cursor")
+
+
+def parse_page_size(page_size) -> int:
+    """Requested page size clamped to 1..PLAYLIST_MAX_PAGE_SIZE; ValueError when it is not a whole number."""
+    if page_size is None or page_size == "" or page_size == 0:
+        return PLAYLIST_PAGE_SIZE
+    if isinstance(page_size, bool) or isinstance(page_size, float) and not page_size.is_integer():
+        raise ValueError("Invalid page_size")
+    try:
+        size = int(page_size)
+    except (TypeError, ValueError):
+        raise ValueError("Invalid page_size") from None
+    return max(1, min(size, PLAYLIST_MAX_PAGE_SIZE))
+
+
+def get_playlist_stats():
+    return {"cache": PLAYLIST_CACHE.stats(), "inflight": _inflight.stats()}
+
+
+def extract_playlist_page(url, cursor=None, page_size=PLAYLIST_PAGE_SIZE, headers=None):
+    """
+    One page of a playlist or channel as flat entries (id, title, duration,
+    url) plus a cursor for the next page. Formats are not extracted here;
+    clients pass entry URLs to /api/fetch when they need them. Raises
+    ValueError for a malformed cursor or page_size.
+    """
+    offset = decode_cursor(cursor)
+    page_size = parse_page_size(page_size)
+
+    # keep the list/channel params a media id would drop, only strip tracking noise
+    key = cache_key(f"playlist:{normalize_url(url)}:{offset}:{page_size}")
+    cached = PLAYLIST_CACHE.get(key)
+    if cached:
+        return {**cached, "cached": True}
+
+    def run():
+        if EXTRACTION_POOL:
+            page = EXTRACTION_POOL.run(_extract_page_in_worker, url, offset, page_size, headers, timeout=PLAYLIST_TIMEOUT)
+        else:
+            page = _extract_page_in_worker(url, offset, page_size, headers)
+        if "error" not in page:
+            PLAYLIST_CACHE.set(key, page)
+        return page
+
+    try:
+        return _inflight.do(key, run, timeout=PLAYLIST_TIMEOUT)
+    except ExtractionQueueFull:
+        return {"error": "Server is busy, please try again shortly"}
+    except (ExtractionTimeout, FlightTimeout):
+        return {"error": "Playlist extraction timed out"}
+    except BrokenProcessPool:
+        return {"error": "Playlist extraction failed, please try again"}
+
+
+def _extract_page_in_worker(url, offset, page_size, headers):
+    platform = detect_platform(url)
+    merged_headers = merge_headers_with_cookie(headers or {}, platform)
+    cookie_file = prepare_cookie_file(headers, platform)
+
+    # Flat + lazy extraction only walks as far as this page (plus one entry
+    # to know whether another page exists), whatever the playlist length.
+    ydl_opts = {
+        "quiet": True,
+        "no_warnings": True,
+        "skip_download": True,
+        "extract_flat": "in_playlist",
+        "lazy_playlist": True,
+        "playlist_items": f"{offset + 1}:{offset + page_size + 1}",
+        "ignoreerrors": True,
+        "socket_timeout": 10,
+        "extractor_retries": 1,
+        "http_headers": merged_headers,
+    }
+
+    if cookie_file:
+        ydl_opts["cookiefile"] = cookie_file
+    if GLOBAL_PROXY:
+        ydl_opts["proxy"] = GLOBAL_PROXY
+
+    try:
+        with YDL_POOLS.checkout("playlist", ydl_opts) as ydl:
+            info = ydl.extract_info(url, download=False)
+    except Exception:
+        return {"error": "Playlist extraction failed"}
+
+    if not info:
+        return {"error": "No metadata"}
+
+    if info.get("_type") not in ("playlist", "multi_video"):
+        return {
+            "type": "video",
+            "platform": platform,
+            "title": info.get("title"),
+            "url": url,
+            "message": "Not a playlist; use /api/fetch for this URL.",
+        }
+
+    entries = []
+    for entry in info.get("entries") or []:
+        if not entry:
+            continue
+        entries.append({
+            "id": entry.get("id"),
+            "title": entry.get("title"),
+            "duration": entry.get("duration"),
+            "url": entry.get("webpage_url") or entry.get("url"),
+        })
+
+    has_more = len(entries) > page_size
+    entries = entries[:page_size]
+
+    return {
+        "type": "playlist",
+        "platform": platform,
+        "id": info.get("id"),
+        "title": info.get("title"),
+        "uploader": info.get("uploader") or info.get("channel"),
+        "webpage_url": info.get("webpage_url"),
+        "count": info.get("playlist_count"),
+        "offset": offset,
+        "entries": entries,
+        "next_cursor": encode_cursor(offset + page_size) if has_more else None,
+        "url": url,
+    }
@@ -1,22 +1,81 @@
 # core/components/progress_hook.py
 
-from utils.status_manager import update_status
-
-def _progress_hook(d, download_id, cancel_event):
-    if cancel_event.is_set():
-        raise Exception("Cancelled by user")
-
-    if d.get("status") != "downloading":
-        return
-
-    total = d.get("total_bytes") or d.get("total_bytes_estimate") or 1
-    downloaded = d.get("downloaded_bytes", 0)
-    percent = int((downloaded / total) * 100)
-    speed = d.get("speed", 0)
-    speed_str = f"{round(speed / 1024, 1)}KB/s" if speed else "0KB/s"
-
-    update_status(download_id, {
-        "status": "downloading",
-        "progress": percent,
-        "speed": speed_str
-    })
+import os
+import threading
+import time
+
+# a status update goes out when the whole percentage changes or this much time passed
+PROGRESS_INTERVAL = float(os.getenv("SAVIFYPRO_PROGRESS_INTERVAL", "1.0"))
+# weight of the newest speed sample in the smoothed speed
+SPEED_SMOOTHING = 0.3
+
+
+def requested_total(ydl, info: dict):
+    """
+    Bytes of every format `ydl` will fetch for `info` (video + audio for
+    merges), when all of them are known. Chosen up front because the
+    progress of each merge part only carries that part's own format.
+    """
+    try:
+        chosen = ydl._select_formats(info.get("formats") or [], ydl.format_selector)
+    except Exception:
+        return None
+    if not chosen:
+        return None
+    formats = chosen[0].get("requested_formats") or chosen[:1]
+    sizes = [f.get("filesize") or f.get("filesize_approx") for f in formats]
+    return sum(sizes) if all(sizes) else None
+
+
+def make_progress_hook(publish, cancel_event, expected_total=None):
+    """
+    yt-dlp progress hook for one job. `publish` takes a status dict; a shared
+    job forwards it to every attached download_id. yt-dlp calls this for
+    every chunk, from several threads for fragmented downloads, so updates
+    are coalesced: at most one per percent or per PROGRESS_INTERVAL.
+    `expected_total` (see requested_total) spans every file of the job;
+    without it the total grows as files start, so the percentage never
+    goes backwards.
+    """
+    lock = threading.Lock()
+    files = {}
+    state = {"percent": None, "sent_at": 0.0, "speed": None}
+
+    def hook(d):
+        if cancel_event.is_set():
+            raise Exception("Cancelled by user")
+
+        if d.get("status") != "downloading":
+            return
+
+        key = d.get("tmpfilename") or d.get("filename")
+        now = time.monotonic()
+        with lock:
+            files[key] = (d.get("downloaded_bytes") or 0, d.get("total_bytes") or d.get("total_bytes_estimate") or 0)
+            downloaded = sum(done for done, _ in files.values())
+            total = max(expected_total or 0, sum(size for _, size in files.values()))
+            percent = min(100, int(downloaded * 100 / total)) if total else 0
+            percent = max(percent, state["percent"] or 0)
+
+            speed = d.get("speed")
+            if speed:
+                smoothed = state["speed"]
+                state["speed"] = speed if smoothed is None else smoothed + SPEED_SMOOTHING * (speed - smoothed)
+
+            if percent == state["percent"] and now - state["sent_at"] < PROGRESS_INTERVAL:
+                return
+            state["percent"] = percent
+            state["sent_at"] = now
+            speed = state["speed"] or 0
+
+        eta = int((total - downloaded) / speed) if speed and total > downloaded else None
+        publish({
+            "status": "downloading",
+            "progress": percent,
+            "speed": f"{round(speed / 1024, 1)}KB/s" if speed else "0KB/s",
+            "downloaded": downloaded,
+            "total": total,
+            "eta": eta,
+        })
+
+    return hook
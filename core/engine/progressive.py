@@ -0,0 +1,115 @@
+# core/engine/progressive.py
+
+import os
+import threading
+import time
+
+PROGRESSIVE_CHUNK_SIZE = 256 * 1024
+PROGRESSIVE_POLL_INTERVAL = 0.25
+# a stream whose file stops growing for this long is ended
+PROGRESSIVE_IDLE_TIMEOUT = float(os.getenv("SAVIFYPRO_PROGRESSIVE_IDLE_TIMEOUT", "60"))
+
+# Only these are playable while incomplete: a progressive MP4 or fragmented
+# MP4 written front to back. Merged formats only exist after ffmpeg runs,
+# and HLS lands as MPEG-TS until it is remuxed.
+_STREAMABLE_EXTS = {"mp4", "m4a"}
+
+
+class GrowingFile:
+    def __init__(self, final_path: str, tmp_path: str):
+        self.final_path = final_path
+        self.tmp_path = tmp_path
+        self.total_bytes = None
+        self.written = 0
+        self.updated_at = time.monotonic()
+        self.done = threading.Event()
+        self.failed = False
+
+    def open(self):
+        """Open whichever name the bytes currently live under; the fd survives the final rename."""
+        for path in (self.tmp_path, self.final_path):
+            try:
+                return open(path, "rb")
+            except FileNotFoundError:
+                continue
+        return None
+
+    def stalled(self) -> bool:
+        return time.monotonic() - self.updated_at > PROGRESSIVE_IDLE_TIMEOUT
+
+
+class ProgressiveRegistry:
+    """Files still being downloaded that clients may already read."""
+
+    def __init__(self):
+        self._files = {}
+        self._lock = threading.Lock()
+        self._counters = {"registered": 0, "streams": 0}
+
+    def observe(self, d: dict, on_start=None, expected_path: str = None):
+        """
+        yt-dlp progress hook: registers a streamable single-file download on
+        its first chunk. Only a file written straight to `expected_path`
+        qualifies; the parts of a merged download (.fNNN.mp4, .fNNN.m4a) are
+        single-track temporaries that are deleted after the merge.
+        """
+        info = d.get("info_dict") or {}
+        filename = d.get("filename")
+        if not filename:
+            return
+        final_path = os.path.abspath(filename)
+        if expected_path is None or final_path != os.path.abspath(expected_path):
+            return
+        if info.get("ext") not in _STREAMABLE_EXTS or str(info.get("protocol", "")).startswith("m3u8"):
+            return
+
+        status = d.get("status")
+        with self._lock:
+            entry = self._files.get(final_path)
+            created = entry is None and status == "downloading"
+            if created:
+                entry = self._files[final_path] = GrowingFile(final_path, os.path.abspath(d.get("tmpfilename") or filename))
+                self._counters["registered"] += 1
+        if entry is None:
+            return
+
+        entry.updated_at = time.monotonic()
+        entry.written = d.get("downloaded_bytes") or entry.written
+        if d.get("total_bytes"):
+            entry.total_bytes = d["total_bytes"]
+        if status == "finished":
+            entry.done.set()
+        if created and on_start:
+            on_start(final_path)
+
+    def get(self, path: str):
+        with self._lock:
+            entry = self._files.get(os.path.abspath(path))
+        if entry is not None and not entry.done.is_set():
+            return entry
+        return None
+
+    def close(self, path: str, failed: bool = False):
+        """The job is over: end open streams and stop offering the file as growing."""
+        with self._lock:
+            entry = self._files.pop(os.path.abspath(path), None)
+        if entry is not None:
+            entry.failed = failed
+            entry.done.set()
+
+    def count_stream(self):
+        with self._lock:
+            self._counters["streams"] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._counters)
+            stats["growing"] = len(self._files)
+        return stats
+
+
+PROGRESSIVE = ProgressiveRegistry()
+
+
+def get_progressive_stats():
+    return PROGRESSIVE.stats()
@@ -0,0 +1,115 @@
+# core/engine/single_flight.py
+
+import threading
+import time
+
+
+class FlightTimeout(Exception):
+    pass
+
+
+class FlightCancelled(Exception):
+    pass
+
+
+class _Flight:
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    In-flight registry: the first caller for a key starts the work on a
+    background thread, every caller (including the first) waits for that
+    one result with its own timeout and cancel event.
+    """
+
+    POLL_INTERVAL = 0.1
+
+    def __init__(self, name: str = "flight"):
+        self.name = name
+        self._flights = {}
+        self._lock = threading.Lock()
+        self._counters = {
+            "started": 0,
+            "coalesced": 0,
+            "timeouts": 0,
+            "cancelled": 0,
+            "errors": 0,
+        }
+
+    def _run(self, key, flight: _Flight, fn):
+        try:
+            flight.result = fn()
+        except BaseException as e:
+            flight.error = e
+            with self._lock:
+                self._counters["errors"] += 1
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    def do(self, key, fn, timeout: float = None, cancel_event: threading.Event = None):
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = _Flight()
+                self._flights[key] = flight
+                self._counters["started"] += 1
+                leader = True
+            else:
+                self._counters["coalesced"] += 1
+                leader = False
+            flight.waiters += 1
+
+        if leader:
+            threading.Thread(
+                target=self._run,
+                args=(key, flight, fn),
+                name=f"{self.name}-{str(key)[:12]}",
+                daemon=True
+            ).start()
+
+        try:
+            self._wait(flight, timeout, cancel_event)
+        finally:
+            with self._lock:
+                flight.waiters -= 1
+
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    def _wait(self, flight: _Flight, timeout, cancel_event):
+        deadline = time.monotonic() + timeout if timeout else None
+        while True:
+            remaining = deadline - time.monotonic() if deadline else self.POLL_INTERVAL
+            if remaining <= 0:
+                with self._lock:
+                    self._counters["timeouts"] += 1
+                raise FlightTimeout(f"{self.name} timed out after {timeout}s")
+
+            if flight.done.wait(min(remaining, self.POLL_INTERVAL)):
+                return
+
+            if cancel_event is not None and cancel_event.is_set():
+                with self._lock:
+                    self._counters["cancelled"] += 1
+                raise FlightCancelled(f"{self.name} cancelled by caller")
+
+    def in_flight(self, key) -> bool:
+        with self._lock:
+            return key in self._flights
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._counters)
+            stats["in_flight"] = len(self._flights)
+            stats["waiting"] = sum(f.waiters for f in self._flights.values())
+        return stats
@@ -0,0 +1,182 @@
+# core/engine/transfer_tuner.py
+
+import json
+import os
+import threading
+import time
+from urllib.parse import urlparse
+
+from dir_setup import STATE_DIR
+
+TUNING_PATH = os.getenv("SAVIFYPRO_TUNING_PATH", os.path.join(STATE_DIR, "transfer_tuning.json"))
+
+MIN_FRAGMENTS, MAX_FRAGMENTS = 2, 32
+MIN_CHUNK, MAX_CHUNK = 1024 ** 2, 32 * 1024 ** 2
+FRAGMENT_STEP = 2
+CHUNK_STEP = 2 * 1024 ** 2
+# transfers smaller than this say more about latency than about the CDN
+MIN_SAMPLE_BYTES = 4 * 1024 ** 2
+# an increase that costs more than this share of throughput is taken back
+REGRESSION = 0.8
+EWMA_WEIGHT = 0.3
+
+# what a CDN says when it wants fewer parallel requests from us
+_BACKOFF_MARKERS = ("429", "403", "too many requests", "throttl", "timed out", "connection reset")
+
+
+def transfer_host(info: dict, fallback: str) -> str:
+    """CDN the selected formats come from, reduced to its last two labels (rr3---x.googlevideo.com -> googlevideo.com)."""
+    formats = info.get("requested_formats") or [info]
+    for f in formats:
+        host = urlparse(f.get("url") or "").hostname
+        if host:
+            return ".".join(host.split(".")[-2:])
+    best = (info.get("formats") or [{}])[-1]
+    host = urlparse(best.get("url") or "").hostname
+    return ".".join(host.split(".")[-2:]) if host else fallback
+
+
+class TransferSample:
+    """One job's settings and what it achieved with them; `hook` is a yt-dlp progress hook."""
+
+    def __init__(self, tuner, host: str, concurrency: int, chunk_size: int):
+        self.tuner = tuner
+        self.host = host
+        self.concurrency = concurrency
+        self.chunk_size = chunk_size
+        self._bytes = {}
+        self._started = None
+        self._active = 0.0
+        self._last = None
+        self._lock = threading.Lock()
+
+    def hook(self, d):
+        if d.get("status") != "downloading":
+            return
+        now = time.monotonic()
+        key = d.get("tmpfilename") or d.get("filename")
+        with self._lock:
+            if self._last is not None and now - self._last < 5:
+                # gaps between files (merging, next format) are not transfer time
+                self._active += now - self._last
+            self._last = now
+            self._bytes[key] = max(self._bytes.get(key, 0), d.get("downloaded_bytes") or 0)
+
+    def finish(self, ok: bool, error: str = None):
+        with self._lock:
+            transferred = sum(self._bytes.values())
+            active = self._active
+        self.tuner.record(self, ok, transferred, active, error)
+
+
+class TransferTuner:
+    """
+    Fragment concurrency and HTTP chunk size learned per CDN host (AIMD).
+
+    A clean transfer that kept up adds one step; an error that smells like
+    throttling halves both; an increase that made throughput drop is taken
+    back. Learned values are written to the state directory and survive
+    restarts.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        # writers serialize here, outside _lock; a snapshot older than the file on disk is dropped
+        self._save_lock = threading.Lock()
+        self._version = 0
+        self._written = 0
+        self._counters = {"samples": 0, "increases": 0, "decreases": 0}
+        try:
+            with open(path, "r", encoding="utf-8") as fh:
+                self._hosts = json.load(fh)
+            if not isinstance(self._hosts, dict):
+                self._hosts = {}
+        except (OSError, ValueError):
+            self._hosts = {}
+
+    def _save(self):
+        with self._lock:
+            self._version += 1
+            version = self._version
+            data = json.dumps(self._hosts, separators=(",", ":"))
+        with self._save_lock:
+            if version < self._written:
+                return
+            self._write(data)
+            self._written = version
+
+    def _write(self, data: str):
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as fh:
+                fh.write(data)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"[✕] Failed to write transfer tuning: {e}")
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+
+    def sample(self, host: str, default_concurrency: int, default_chunk: int) -> TransferSample:
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is None:
+                state = self._hosts[host] = {
+                    "concurrency": default_concurrency,
+                    "chunk_size": default_chunk,
+                    "throughput": 0,
+                    "samples": 0,
+                    "errors": 0,
+                }
+            return TransferSample(self, host, state["concurrency"], state["chunk_size"])
+
+    def record(self, sample: TransferSample, ok: bool, transferred: int, active: float, error: str = None):
+        throttled = not ok and any(m in (error or "").lower() for m in _BACKOFF_MARKERS)
+        if ok and (transferred < MIN_SAMPLE_BYTES or active <= 0):
+            return
+        if not ok and not throttled:
+            # broken links and private videos say nothing about the CDN
+            return
+
+        with self._lock:
+            state = self._hosts[sample.host]
+            state["samples"] += 1
+            self._counters["samples"] += 1
+            if throttled:
+                state["errors"] += 1
+                state["concurrency"] = max(MIN_FRAGMENTS, sample.concurrency // 2)
+                state["chunk_size"] = max(MIN_CHUNK, sample.chunk_size // 2)
+                self._counters["decreases"] += 1
+            else:
+                rate = transferred / active
+                previous = state["throughput"]
+                if previous and rate < previous * REGRESSION and sample.concurrency > MIN_FRAGMENTS:
+                    # the last step up hurt: step back down instead of climbing further
+                    state["concurrency"] = max(MIN_FRAGMENTS, sample.concurrency - FRAGMENT_STEP)
+                    state["chunk_size"] = max(MIN_CHUNK, sample.chunk_size - CHUNK_STEP)
+                    self._counters["decreases"] += 1
+                else:
+                    state["concurrency"] = min(MAX_FRAGMENTS, sample.concurrency + FRAGMENT_STEP)
+                    state["chunk_size"] = min(MAX_CHUNK, sample.chunk_size + CHUNK_STEP)
+                    self._counters["increases"] += 1
+                state["throughput"] = int(rate if not previous else previous + EWMA_WEIGHT * (rate - previous))
+            state["updated"] = time.time()
+        self._save()
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._counters)
+            stats["hosts"] = {
+                host: {k: state[k] for k in ("concurrency", "chunk_size", "throughput", "samples", "errors")}
+                for host, state in self._hosts.items()
+            }
+        return stats
+
+
+TUNER = TransferTuner(TUNING_PATH)
+
+
+def get_transfer_tuning_stats():
+    return TUNER.stats()
@@ -1,6 +1,5 @@
 import os
 import re
-import threading
 from urllib.parse import quote
 import uuid
 import yt_dlp  # type: ignore
@@ -9,17 +8,29 @@ import time
 
 from advanced.anti_blocker import GLOBAL_PROXY
 from config.server_config import SERVER_URL
-from core.engine.progress_hook import _progress_hook
+from core.engine.bandwidth import GOVERNOR, bandwidth_hook
+from core.engine.download_jobs import DOWNLOADS, running
+from core.engine.job_journal import JOURNAL
+from core.engine.job_scheduler import SCHEDULER, video_priority
+from core.engine.metadata_extractor import get_cached_duration, resolve_download_info
+from core.engine.progress_hook import make_progress_hook, requested_total
+from core.engine.progressive import PROGRESSIVE
+from core.engine.transfer_tuner import TUNER, transfer_host
+from core.engine.ydl_pool import YDL_POOLS
 from dir_setup import VIDEO_DIR
 from utils.cookie_loader import prepare_cookie_file
-from utils.filename_generator import _find_existing_video_file, generate_video_filename
-from utils.platform_detector import detect_platform, merge_headers_with_cookie
-from utils.status_manager import update_status
-
-_download_threads = {}
-_download_locks = {}
-
-def start_download(url, resolution, bandwidth_limit=None, headers=None, audio_lang=None):
+from utils.filename_generator import generate_video_filename
+from utils.platform_detector import detect_platform, media_key, merge_headers_with_cookie
+from utils.content_store import CONTENT_STORE, IntegrityError
+from utils.storage_index import STORAGE_INDEX
+
+def _remove_quietly(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+def start_download(url, resolution, bandwidth_limit=None, headers=None, audio_lang=None, plan=None, download_id=None):
     def parse_bandwidth_limit(limit):
         try:
             if not limit:
@@ -35,45 +46,55 @@ def start_download(url, resolution, bandwidth_limit=None, headers=None, audio_la
         except:
             return None
 
-    download_id = str(uuid.uuid4())
+    download_id = download_id or str(uuid.uuid4())
     platform = detect_platform(url)
-    cancel_event = threading.Event()
-    _download_locks[download_id] = cancel_event
+
+    # Identical requests share one transfer; each caller keeps its own download_id
+    media = media_key(url)
+    quality = f"{resolution}:{audio_lang}" if audio_lang else resolution
+    job, created = DOWNLOADS.acquire(("video", media, quality), download_id)
+    cancel_event = job.cancel_event
+    if not created:
+        return download_id
+    # plans are signed per process, so a resumed job re-resolves instead
+    JOURNAL.record(download_id, "video", url, {
+        "resolution": resolution,
+        "bandwidth_limit": bandwidth_limit,
+        "headers": headers,
+        "audio_lang": audio_lang,
+    })
 
     def run():
-        update_status(download_id, {"status": "starting", "progress": 0, "speed": "0KB/s", "video_url": None})
+        if cancel_event.is_set():
+            DOWNLOADS.release(job)
+            return
+        job.publish({"status": "starting", "progress": 0, "speed": "0KB/s", "video_url": None})
+        expected_path = None
+        transfer = None
+
+        def stream_started(path):
+            # same URL as the finished file; until then it serves the bytes written so far
+            stream_url = f"{SERVER_URL}/download/video/{quote(os.path.basename(path), safe='')}"
+            job.publish({"stream_url": stream_url})
 
         try:
+            existing = STORAGE_INDEX.lookup("video", media, quality)
+            if existing:
+                video_url = f"{SERVER_URL}/download/video/{quote(os.path.basename(existing), safe='')}"
+                job.publish({"status": "completed", "progress": 99, "speed": "0KB/s", "video_url": video_url})
+                return
+
             merged_headers = merge_headers_with_cookie(headers or {}, platform)
             cookie_file = prepare_cookie_file(headers, platform)
 
-            title = "video"
-            try:
-                with yt_dlp.YoutubeDL({
-                    "quiet": True,
-                    "skip_download": True,
-                    "http_headers": merged_headers,
-                    "cookiefile": cookie_file if cookie_file else None
-                }) as ydl:
-                    info = ydl.extract_info(url, download=False)
-                    if isinstance(info, dict) and info.get("title"):
-                        title = info["title"]
-            except:
-                pass
+            # Reuse the /api/fetch extraction (or its signed plan) instead of re-extracting
+            info, info_source = resolve_download_info(url, plan, merged_headers, cookie_file)
+            title = info.get("title") or "video"
 
             expected_filename = generate_video_filename(title, resolution)
             expected_path = os.path.join(VIDEO_DIR, expected_filename)
-
-            if os.path.exists(expected_path) and os.path.getsize(expected_path) > 0:
-                video_url = f"{SERVER_URL}/download/video/{quote(os.path.basename(expected_path), safe='')}"
-                update_status(download_id, {"status": "completed", "progress": 99, "speed": "0KB/s", "video_url": video_url})
-                return
-
-            matched = _find_existing_video_file(expected_filename)
-            if matched and os.path.getsize(matched) > 0:
-                video_url = f"{SERVER_URL}/download/video/{quote(os.path.basename(matched), safe='')}"
-                update_status(download_id, {"status": "completed", "progress": 99, "speed": "0KB/s", "video_url": video_url})
-                return
+            job.output_prefix = os.path.splitext(expected_path)[0]
+            JOURNAL.set_output(job.primary_id, job.output_prefix)
 
             height = re.sub(r"[^0-9]", "", resolution) or "1080"
             video_fmt = f"bestvideo[ext=mp4][height={height}]"
@@ -82,7 +103,8 @@ def start_download(url, resolution, bandwidth_limit=None, headers=None, audio_la
                 audio_fmt += f"[language^{audio_lang}]"
             format_selector = f"{video_fmt}+{audio_fmt}/best[ext=mp4][height<={height}]/best"
 
-            concurrency = max(8, min(32, (os.cpu_count() or 4) * 2))
+            # fragment fan-out and chunk size learned for this CDN; CPU-based until measured
+            transfer = TUNER.sample(transfer_host(info, platform), max(8, min(32, (os.cpu_count() or 4) * 2)), 10 * 1024 * 1024)
             rate_limit = parse_bandwidth_limit(bandwidth_limit)
 
             ydl_opts = {
@@ -92,14 +114,19 @@ def start_download(url, resolution, bandwidth_limit=None, headers=None, audio_la
                 "noplaylist": True,
                 "merge_output_format": "mp4",
                 "http_headers": merged_headers,
-                "progress_hooks": [lambda d: _progress_hook(d, download_id, cancel_event)],
+                "progress_hooks": [
+                    lambda d: PROGRESSIVE.observe(d, stream_started, expected_path),
+                    bandwidth_hook(job, cancel_event),
+                    transfer.hook,
+                ],
                 "postprocessors": [
                     {"key": "FFmpegVideoConvertor", "preferedformat": "mp4"}
                 ],
                 "postprocessor_args": ["-movflags", "+faststart", "-max_muxing_queue_size", "9999"],
-                "concurrent_fragment_downloads": concurrency,
-                "http_chunk_size": 10 * 1024 * 1024,
-                "nopart": True,
+                "concurrent_fragment_downloads": transfer.concurrency,
+                "http_chunk_size": transfer.chunk_size,
+                # keep .part files so a restarted job resumes instead of starting over
+                "nopart": False,
                 "noresizebuffer": True,
                 "buffersize": 32 * 1024 * 1024,
                 "retries": 10,
@@ -119,21 +146,37 @@ def start_download(url, resolution, bandwidth_limit=None, headers=None, audio_la
                 ydl_opts["proxy"] = GLOBAL_PROXY
 
             start_time = time.time()
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                ydl.download([url])
+            with YDL_POOLS.checkout("video", ydl_opts) as ydl, running(job):
+                ydl.add_progress_hook(make_progress_hook(job.publish, cancel_event, requested_total(ydl, info)))
+                try:
+                    ydl.process_ie_result(info, download=True)
+                except yt_dlp.utils.DownloadError:
+                    if info_source == "extracted" or cancel_event.is_set():
+                        raise
+                    # Cached stream URLs can go stale early; fall back to a fresh extraction
+                    ydl.download([url])
             elapsed = round(time.time() - start_time, 2)
 
             if cancel_event.is_set():
-                update_status(download_id, {"status": "cancelled"})
+                job.finish_cancelled()
                 return
+            transfer.finish(True)
 
             if not os.path.exists(expected_path) or os.path.getsize(expected_path) == 0:
                 raise FileNotFoundError("Output file missing after download.")
 
+            # Hash once while moving the bytes into the content store; truncated output fails here
+            stored = CONTENT_STORE.ingest(expected_path)
+            STORAGE_INDEX.add("video", media, quality, expected_path, digest=stored["digest"])
             video_url = f"{SERVER_URL}/download/video/{quote(os.path.basename(expected_path), safe='')}"
-            update_status(download_id, {"status": "completed", "progress": 99, "speed": "0KB/s", "video_url": video_url})
+            job.publish({"status": "completed", "progress": 99, "speed": "0KB/s", "video_url": video_url, "filesize": stored["size"]})
 
         except yt_dlp.utils.DownloadError as e:
+            if cancel_event.is_set():
+                job.finish_cancelled()
+                return
+            if transfer:
+                transfer.finish(False, str(e))
             msg = str(e).lower()
             error_msg = (
                 "Login or CAPTCHA required." if ("sign in" in msg or "captcha" in msg) else
@@ -141,12 +184,27 @@ def start_download(url, resolution, bandwidth_limit=None, headers=None, audio_la
                 "Format not available or private video." if "requested format not available" in msg else
                 "Download failed."
             )
-            update_status(download_id, {"status": "error", "error": error_msg})
+            job.publish({"status": "error", "error": error_msg})
+        except IntegrityError as e:
+            print(f"[✕] ERROR: {e}")
+            _remove_quietly(expected_path)
+            job.publish({"status": "error", "error": "Downloaded file is incomplete, please retry."})
         except Exception:
+            if cancel_event.is_set():
+                job.finish_cancelled()
+                return
             traceback.print_exc()
-            update_status(download_id, {"status": "error", "error": "Unexpected error occurred while downloading."})
-
-    thread = threading.Thread(target=run, daemon=True)
-    _download_threads[download_id] = thread
-    thread.start()
+            job.publish({"status": "error", "error": "Unexpected error occurred while downloading."})
+        finally:
+            if expected_path:
+                PROGRESSIVE.close(expected_path, failed=job.status != "completed")
+            GOVERNOR.forget(job)
+            DOWNLOADS.release(job)
+
+    # Short videos jump ahead of long ones; the scheduler caps per-platform concurrency
+    try:
+        SCHEDULER.submit(download_id, run, platform=platform, priority=video_priority(get_cached_duration(url)), publish=job.publish)
+    except Exception:
+        DOWNLOADS.release(job)
+        raise
     return download_id
@@ -0,0 +1,245 @@
+# core/engine/ydl_pool.py
+
+import hashlib
+import json
+import os
+import threading
+import time
+import traceback
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import yt_dlp  # type: ignore
+from yt_dlp.postprocessor import get_postprocessor  # type: ignore
+from yt_dlp.utils import POSTPROCESS_WHEN  # type: ignore
+
+from utils.cookie_loader import TEMP_COOKIE_SUFFIX
+
+YDL_POOL_SIZE = int(os.getenv("SAVIFYPRO_YDL_POOL_SIZE", "4"))
+YDL_POOL_WAIT = float(os.getenv("SAVIFYPRO_YDL_POOL_WAIT", "0.5"))
+YDL_MAX_POOLS = 32
+
+# Options that change from one job to the next. Everything else (headers,
+# cookies, proxy, extractor args...) decides which pool an instance lives in.
+PER_JOB_KEYS = {
+    "format",
+    "outtmpl",
+    "progress_hooks",
+    "postprocessor_hooks",
+    "postprocessors",
+    "post_hooks",
+    "ratelimit",
+    "concurrent_fragment_downloads",
+    "http_chunk_size",
+    "playlist_items",
+}
+
+
+def _fingerprint(profile: str, opts: dict) -> str:
+    identity = {k: v for k, v in opts.items() if k not in PER_JOB_KEYS}
+    raw = json.dumps(identity, sort_keys=True, default=str)
+    return f"{profile}:{hashlib.sha1(raw.encode('utf-8')).hexdigest()[:16]}"
+
+
+def _new_instance(opts: dict):
+    base = {k: v for k, v in opts.items() if k not in PER_JOB_KEYS}
+    ydl = yt_dlp.YoutubeDL(base)
+    ydl._savify_base_params = dict(ydl.params)
+    return ydl
+
+
+def _apply_job(ydl, opts: dict):
+    """Swap in one job's options and clear whatever the previous job left behind."""
+    params = dict(ydl._savify_base_params)
+    for key in PER_JOB_KEYS - {"progress_hooks", "postprocessor_hooks", "postprocessors", "post_hooks"}:
+        if key in opts:
+            params[key] = opts[key]
+
+    outtmpl = opts.get("outtmpl")
+    if outtmpl is not None:
+        params["outtmpl"] = dict(outtmpl) if isinstance(outtmpl, dict) else {"default": outtmpl}
+    else:
+        params["outtmpl"] = dict(params.get("outtmpl") or {})
+    ydl.params = params
+
+    # YoutubeDL compiles `format` once in __init__; recompile it for this job
+    fmt = params.get("format")
+    ydl.format_selector = fmt if fmt in (None, "-") or callable(fmt) else ydl.build_format_selector(fmt)
+
+    ydl._progress_hooks = list(opts.get("progress_hooks") or [])
+    ydl._postprocessor_hooks = list(opts.get("postprocessor_hooks") or [])
+    ydl._post_hooks = list(opts.get("post_hooks") or [])
+    ydl._pps = {when: [] for when in POSTPROCESS_WHEN}
+    for pp_def in opts.get("postprocessors") or []:
+        pp_def = dict(pp_def)
+        when = pp_def.pop("when", "post_process")
+        # the constructor already binds ydl and its hooks; add_post_processor would bind them twice
+        ydl._pps[when].append(get_postprocessor(pp_def.pop("key"))(ydl, **pp_def))
+
+    ydl._num_downloads = 0
+    ydl._download_retcode = 0
+    ydl._playlist_level = 0
+    ydl._playlist_urls = set()
+
+
+class YDLPool:
+    """Ready YoutubeDL instances sharing one option profile."""
+
+    def __init__(self, key: str, size: int):
+        self.key = key
+        self.size = max(1, size)
+        self._idle = []
+        self._created = 0
+        self.closed = False
+        self._cond = threading.Condition()
+
+    def acquire(self, opts: dict):
+        """Returns (ydl, pooled, outcome, waited)."""
+        deadline = time.monotonic() + YDL_POOL_WAIT
+        waited = False
+        with self._cond:
+            while True:
+                if self._idle:
+                    return self._idle.pop(), True, "reused", waited
+                if self._created < self.size:
+                    self._created += 1
+                    outcome = "created"
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    outcome = "overflow"
+                    break
+                waited = True
+                self._cond.wait(remaining)
+
+        if outcome == "overflow":
+            # pool exhausted: serve the job with a throwaway instance
+            return _new_instance(opts), False, outcome, waited
+
+        try:
+            return _new_instance(opts), True, outcome, waited
+        except Exception:
+            self.release(None, healthy=False)
+            raise
+
+    def release(self, ydl, healthy: bool):
+        with self._cond:
+            keep = healthy and not self.closed
+            if keep:
+                self._idle.append(ydl)
+            else:
+                self._created -= 1
+            self._cond.notify()
+        if not keep and ydl is not None:
+            _close(ydl)
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            idle, self._idle = self._idle, []
+            self._created -= len(idle)
+        for ydl in idle:
+            _close(ydl)
+
+
+def _close(ydl):
+    try:
+        ydl.close()
+    except Exception:
+        pass
+
+
+class YDLPools:
+    def __init__(self, size: int = YDL_POOL_SIZE):
+        self.size = size
+        self._pools = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"created": 0, "reused": 0, "waits": 0, "overflow": 0, "unpooled": 0, "discarded": 0}
+
+    def _pool_for(self, key: str) -> YDLPool:
+        evicted = None
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool is None:
+                pool = self._pools[key] = YDLPool(key, self.size)
+                if len(self._pools) > YDL_MAX_POOLS:
+                    _, evicted = self._pools.popitem(last=False)
+            self._pools.move_to_end(key)
+        if evicted:
+            evicted.close()
+        return pool
+
+    def _count(self, *names):
+        with self._lock:
+            for name in names:
+                self._stats[name] += 1
+
+    @contextmanager
+    def checkout(self, profile: str, opts: dict):
+        """
+        Borrow a YoutubeDL configured with `opts`. Instances are keyed on
+        `profile` plus every non-per-job option, so a checked-out instance
+        only differs from a fresh one in the per-job keys reset here.
+        """
+        cookiefile = opts.get("cookiefile") or ""
+        if self.size <= 0 or cookiefile.endswith(TEMP_COOKIE_SUFFIX):
+            # one-off header cookies would never be reused
+            self._count("unpooled")
+            with yt_dlp.YoutubeDL(opts) as ydl:
+                yield ydl
+            return
+
+        pool = self._pool_for(_fingerprint(profile, opts))
+        ydl, pooled, outcome, waited = pool.acquire(opts)
+        self._count(outcome, *(["waits"] if waited else []))
+
+        try:
+            _apply_job(ydl, opts)
+        except Exception:
+            # unknown yt-dlp internals: never hand out a half-reset instance
+            traceback.print_exc()
+            if pooled:
+                pool.release(ydl, healthy=False)
+            else:
+                _close(ydl)
+            self._count("discarded", "unpooled")
+            with yt_dlp.YoutubeDL(opts) as ydl:
+                yield ydl
+            return
+
+        healthy = True
+        try:
+            yield ydl
+        except yt_dlp.utils.DownloadError:
+            raise
+        except BaseException:
+            healthy = False
+            raise
+        finally:
+            try:
+                ydl.save_cookies()
+            except Exception:
+                healthy = False
+            if pooled:
+                if not healthy:
+                    self._count("discarded")
+                pool.release(ydl, healthy)
+            else:
+                _close(ydl)
+
+    def stats(self) -> dict:
+        with self._lock:
+            pools = list(self._pools.values())
+        with self._lock:
+            stats = dict(self._stats)
+        stats["pools"] = len(pools)
+        stats["idle"] = sum(len(p._idle) for p in pools)
+        stats["size"] = self.size
+        return stats
+
+
+YDL_POOLS = YDLPools()
+
+
+def get_ydl_pool_stats():
+    return YDL_POOLS.stats()
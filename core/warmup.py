@@ -0,0 +1,124 @@
+# core/warmup.py
+
+import importlib
+import threading
+import time
+import traceback
+
+# Heavy imports, in dependency order, so each timing is that module's own cost
+WARMUP_MODULES = [
+    "yt_dlp",
+    "core.engine.ydl_pool",
+    "core.engine.metadata_extractor",
+    "core.engine.playlist_extractor",
+    "core.engine.batch_extractor",
+    "core.engine.video_downloader",
+    "core.engine.audio_downloader",
+]
+
+_state = {
+    "ready": False,
+    "started_at": None,
+    "finished_at": None,
+    "duration_ms": None,
+    "startup_ms": {},
+    "imports_ms": {},
+    "steps_ms": {},
+    "errors": [],
+}
+_lock = threading.Lock()
+_thread = None
+
+
+def _ms(since: float) -> float:
+    return round((time.perf_counter() - since) * 1000, 1)
+
+
+def record_startup(name: str, started: float):
+    """Record a synchronous startup phase (e.g. app import) in the report."""
+    with _lock:
+        _state["startup_ms"][name] = _ms(started)
+
+
+def _step(name: str, fn):
+    started = time.perf_counter()
+    try:
+        fn()
+    except Exception as e:
+        traceback.print_exc()
+        with _lock:
+            _state["errors"].append(f"{name}: {e}")
+        return False
+    with _lock:
+        _state["steps_ms"][name] = _ms(started)
+    return True
+
+
+def _warm_extractors():
+    from yt_dlp.extractor import get_info_extractor  # type: ignore
+    get_info_extractor("Youtube")
+
+
+def _start_extraction_pool():
+    from core.engine.extraction_pool import EXTRACTION_POOL
+    if EXTRACTION_POOL:
+        EXTRACTION_POOL.start()
+
+
+def _resume_jobs():
+    from core.engine.job_journal import resume_unfinished_jobs
+    resume_unfinished_jobs()
+
+
+def _run():
+    started = time.perf_counter()
+
+    for name in WARMUP_MODULES:
+        t = time.perf_counter()
+        try:
+            importlib.import_module(name)
+        except Exception as e:
+            traceback.print_exc()
+            with _lock:
+                _state["errors"].append(f"import {name}: {e}")
+                _state["finished_at"] = time.time()
+            print(f"[✕] ERROR: Warm-up failed importing {name}")
+            return
+        with _lock:
+            _state["imports_ms"][name] = _ms(t)
+
+    _step("youtube_extractor", _warm_extractors)
+    _step("extraction_pool", _start_extraction_pool)
+    _step("resume_jobs", _resume_jobs)
+
+    with _lock:
+        _state["ready"] = True
+        _state["finished_at"] = time.time()
+        _state["duration_ms"] = _ms(started)
+        report = sorted(_state["imports_ms"].items(), key=lambda kv: -kv[1])
+
+    print(f"[✓] Warm-up finished in {_state['duration_ms']}ms")
+    for name, ms in report:
+        print(f"    • {name}: {ms}ms")
+
+
+def start_warmup():
+    """Start the background warm-up once; safe to call repeatedly."""
+    global _thread
+    with _lock:
+        if _thread is not None:
+            return
+        _state["started_at"] = time.time()
+        _thread = threading.Thread(target=_run, name="warmup", daemon=True)
+    _thread.start()
+
+
+def get_readiness() -> dict:
+    with _lock:
+        return {
+            **_state,
+            "startup_ms": dict(_state["startup_ms"]),
+            "imports_ms": dict(_state["imports_ms"]),
+            "steps_ms": dict(_state["steps_ms"]),
+            "errors": list(_state["errors"]),
+        }
@@ -3,10 +3,14 @@
 import os
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-VIDEO_DIR = os.path.join(BASE_DIR, "storage", "videos")
-AUDIO_DIR = os.path.join(BASE_DIR, "storage", "audios")
+STORAGE_DIR = os.path.join(BASE_DIR, "storage")
+VIDEO_DIR = os.path.join(STORAGE_DIR, "videos")
+AUDIO_DIR = os.path.join(STORAGE_DIR, "audios")
 METADATA_DIR = os.path.join(BASE_DIR, "cache")
+# survives the cleaner: job journal and other restart state
+STATE_DIR = os.path.join(BASE_DIR, "state")
 
 os.makedirs(VIDEO_DIR, exist_ok=True)
 os.makedirs(AUDIO_DIR, exist_ok=True)
 os.makedirs(METADATA_DIR, exist_ok=True)
+os.makedirs(STATE_DIR, exist_ok=True)
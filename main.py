@@ -1,12 +1,18 @@
+import time
+
+_IMPORT_STARTED = time.perf_counter()
+
 import threading
 import uvicorn
 
-from config.server_config import FINAL_IP, SERVER_URL, create_app, SERVER_PORT
+from config.server_config import create_app, SERVER_PORT
 from api_registory import register_all_routes
+from core.warmup import record_startup
 from utils.cleaner import run_cleaner
 
 app = create_app()
 register_all_routes(app)
+record_startup("app_import", _IMPORT_STARTED)
 
 def start_cleaner_in_background():
     cleaner_thread = threading.Thread(
@@ -16,11 +22,13 @@ def start_cleaner_in_background():
     cleaner_thread.start()
 
 if __name__ == "__main__":
+    from config.server_config import ENVIRONMENT, FINAL_IP, SERVER_URL
     print(f"[!] INFO: Starting SavifyPro Server on {FINAL_IP}")
     print(f"[!] INFO: Access the API at {SERVER_URL}")
     start_cleaner_in_background()
     uvicorn.run("main:app",
         host="0.0.0.0",
         port=SERVER_PORT,
-        reload=True
+        # a reload restarts the process; only worth it while developing locally
+        reload=ENVIRONMENT == "local"
     )
@@ -0,0 +1,73 @@
+import pytest
+
+pytest.importorskip("yt_dlp")
+
+from core.engine.ydl_pool import YDLPools
+
+FORMATS = [
+    {"format_id": "140", "ext": "m4a", "vcodec": "none", "acodec": "mp4a.40.2", "url": "https://x/140"},
+    {"format_id": "137", "ext": "mp4", "vcodec": "avc1", "acodec": "none", "height": 1080, "url": "https://x/137"},
+    {"format_id": "18", "ext": "mp4", "vcodec": "avc1", "acodec": "mp4a.40.2", "height": 360, "url": "https://x/18"},
+]
+
+
+def _selected(ydl):
+    return [f["format_id"] for f in ydl._select_formats(FORMATS, ydl.format_selector)]
+
+
+def test_pooled_instance_uses_each_jobs_format():
+    pools = YDLPools(size=1)
+    base = {"quiet": True, "noplaylist": True}
+
+    with pools.checkout("test", {**base, "format": "bestaudio[ext=m4a]"}) as first:
+        assert _selected(first) == ["140"]
+
+    with pools.checkout("test", {**base, "format": "best[height<=360]"}) as second:
+        assert second is first
+        assert _selected(second) == ["18"]
+
+
+def _convert_to_mp3(self, info):
+    # what FFmpegExtractAudioPP does: a new file, the input handed back for deletion
+    source = info["filepath"]
+    target = source.rsplit(".", 1)[0] + ".mp3"
+    with open(source, "rb") as src, open(target, "wb") as dst:
+        dst.write(src.read())
+    info.update(filepath=target, ext="mp3")
+    return [source], info
+
+
+def test_post_hook_reports_the_converted_file(tmp_path, monkeypatch):
+    from yt_dlp.postprocessor import FFmpegExtractAudioPP
+    from yt_dlp.postprocessor.common import PostProcessorMetaClass
+
+    # wrapped like the real run(), so postprocessor hooks still fire
+    monkeypatch.setattr(FFmpegExtractAudioPP, "run", PostProcessorMetaClass.run_wrapper(_convert_to_mp3))
+    source = tmp_path / "source.m4a"
+    source.write_bytes(b"\0" * 4096)
+    info = {
+        "id": "x", "title": "Title", "extractor": "generic", "extractor_key": "Generic",
+        "webpage_url": source.as_uri(),
+        "formats": [{"format_id": "140", "ext": "m4a", "vcodec": "none", "acodec": "mp4a.40.2", "url": source.as_uri()}],
+    }
+    pools = YDLPools(size=1)
+
+    for run in range(2):
+        outputs, events = [], []
+        opts = {
+            "quiet": True, "noprogress": True, "enable_file_urls": True,
+            "format": "bestaudio", "outtmpl": str(tmp_path / f"Title{run}.%(ext)s"),
+            "postprocessors": [{"key": "FFmpegExtractAudio", "preferredcodec": "mp3"}],
+            "post_hooks": [outputs.append],
+            "postprocessor_hooks": [lambda d: events.append((d["postprocessor"], d["status"]))],
+        }
+        with pools.checkout("audio", opts) as ydl:
+            ydl.process_ie_result(dict(info), download=True)
+
+        # once per run: the pooled instance dropped the previous job's hook
+        assert outputs == [str(tmp_path / f"Title{run}.mp3")]
+        # hooks bound once per reuse, not once per bind
+        assert [status for pp, status in events if pp == "ExtractAudio"] == ["started", "finished"]
+        assert (tmp_path / f"Title{run}.mp3").exists()
+        assert not (tmp_path / f"Title{run}.m4a").exists()
+    assert pools.stats()["reused"] == 1
@@ -0,0 +1,214 @@
+# utils/artifact_cache.py
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+
+from dir_setup import STORAGE_DIR
+
+DERIVED_DIR = os.path.join(STORAGE_DIR, "derived")
+DERIVED_MANIFEST_PATH = os.path.join(DERIVED_DIR, "index.json")
+# disk budget for conversions kept after the cleaner wipes storage/audios
+DERIVED_MAX_BYTES = int(os.getenv("SAVIFYPRO_DERIVED_MAX_BYTES", str(2 * 1024 ** 3)))
+# an artifact nobody asked for in this long is cold and goes first
+DERIVED_COLD_AFTER = int(os.getenv("SAVIFYPRO_DERIVED_COLD_AFTER", str(6 * 60 * 60)))
+# hits needed before an artifact counts as hot and is evicted last
+DERIVED_HOT_HITS = 2
+HASH_CHUNK_SIZE = 1024 * 1024
+
+os.makedirs(DERIVED_DIR, exist_ok=True)
+
+
+def file_digest(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(HASH_CHUNK_SIZE), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def artifact_key(source: str, codec: str, bitrate: str, tags: dict = None) -> str:
+    """Stable id for one encoding of one source; any parameter change is a different artifact."""
+    raw = json.dumps([source, codec, str(bitrate), tags or {}], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _place(source: str, target: str):
+    """Put the bytes of `source` at `target`, sharing them when the filesystem allows."""
+    tmp = f"{target}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        os.link(source, tmp)
+    except OSError:
+        shutil.copyfile(source, tmp)
+    try:
+        os.replace(tmp, target)
+    except OSError:
+        os.remove(tmp)
+        raise
+
+
+class ArtifactCache:
+    """
+    Transcoded outputs keyed by (source content id, codec, bitrate, tags).
+
+    Each artifact is a hard link under storage/derived, so it outlives the
+    cleaner's sweep of storage/audios and a repeat conversion is a link
+    instead of an ffmpeg run. Eviction keeps hot artifacts (hit repeatedly
+    and recently) and drops cold ones first when over budget.
+    """
+
+    def __init__(self, directory: str, manifest_path: str, max_bytes: int):
+        self.directory = directory
+        self.manifest_path = manifest_path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # writers serialize here, outside _lock; a snapshot older than the file on disk is dropped
+        self._save_lock = threading.Lock()
+        self._version = 0
+        self._written = 0
+        self._counters = {"hits": 0, "misses": 0, "stored": 0, "evicted": 0}
+        try:
+            with open(manifest_path, "r", encoding="utf-8") as fh:
+                entries = json.load(fh).get("entries") or {}
+        except (OSError, ValueError, AttributeError):
+            entries = {}
+        self._entries = {k: e for k, e in entries.items() if os.path.isfile(self._path(k, e))}
+
+    def _path(self, key: str, entry: dict) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}{entry['ext']}")
+
+    def _save(self):
+        with self._lock:
+            self._version += 1
+            version = self._version
+            data = json.dumps({"entries": self._entries}, separators=(",", ":"))
+        with self._save_lock:
+            if version < self._written:
+                return
+            self._write(data)
+            self._written = version
+
+    def _write(self, data: str):
+        tmp = f"{self.manifest_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as fh:
+                fh.write(data)
+            os.replace(tmp, self.manifest_path)
+        except OSError as e:
+            print(f"[✕] Failed to write artifact cache index: {e}")
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+
+    def fetch(self, key: str, target_stem: str):
+        """
+        Materialise a cached artifact at `target_stem` plus its extension.
+        Returns that path, or None on a miss (including an artifact whose
+        file disappeared).
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._counters["misses"] += 1
+                return None
+            path = self._path(key, entry)
+        target = f"{target_stem}{entry['ext']}"
+
+        try:
+            if not os.path.exists(target) or not os.path.samefile(path, target):
+                _place(path, target)
+        except OSError:
+            with self._lock:
+                if self._entries.get(key) is entry:
+                    del self._entries[key]
+                self._counters["misses"] += 1
+            self._save()
+            return None
+
+        with self._lock:
+            entry["hits"] += 1
+            entry["last_used"] = time.time()
+            self._counters["hits"] += 1
+        self._save()
+        return target
+
+    def digest(self, key: str):
+        """Content digest recorded when the artifact was stored (None for older entries)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry.get("digest") if entry else None
+
+    def put(self, key: str, path: str, digest: str = None):
+        """Keep a freshly produced artifact; `path` stays where it is."""
+        entry = {
+            "ext": os.path.splitext(path)[1].lower(),
+            "size": os.path.getsize(path),
+            "digest": digest,
+            "hits": 0,
+            "created": time.time(),
+            "last_used": time.time(),
+        }
+        target = self._path(key, entry)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        _place(path, target)
+        with self._lock:
+            self._entries[key] = entry
+            self._counters["stored"] += 1
+        self._save()
+
+    def evict(self) -> int:
+        """
+        Drop cold artifacts, then the coldest remaining ones until the cache
+        fits its byte budget. Hot artifacts only go when nothing else is left.
+        """
+        now = time.time()
+        with self._lock:
+            def hot(entry):
+                return entry["hits"] >= DERIVED_HOT_HITS and now - entry["last_used"] < DERIVED_COLD_AFTER
+
+            # cold first, then oldest use first
+            order = sorted(self._entries.items(), key=lambda kv: (hot(kv[1]), kv[1]["last_used"]))
+            total = sum(e["size"] for e in self._entries.values())
+            victims = []
+            for key, entry in order:
+                cold = now - entry["last_used"] >= DERIVED_COLD_AFTER
+                if not cold and total <= self.max_bytes:
+                    break
+                victims.append((key, entry))
+                total -= entry["size"]
+            for key, _ in victims:
+                del self._entries[key]
+            self._counters["evicted"] += len(victims)
+
+        for key, entry in victims:
+            try:
+                os.remove(self._path(key, entry))
+            except OSError:
+                pass
+        if victims:
+            self._save()
+        return len(victims)
+
+    def stats(self) -> dict:
+        now = time.time()
+        with self._lock:
+            stats = dict(self._counters)
+            stats["entries"] = len(self._entries)
+            stats["bytes"] = sum(e["size"] for e in self._entries.values())
+            stats["hot"] = sum(
+                1 for e in self._entries.values()
+                if e["hits"] >= DERIVED_HOT_HITS and now - e["last_used"] < DERIVED_COLD_AFTER
+            )
+        stats["max_bytes"] = self.max_bytes
+        return stats
+
+
+ARTIFACT_CACHE = ArtifactCache(DERIVED_DIR, DERIVED_MANIFEST_PATH, DERIVED_MAX_BYTES)
+
+
+def get_artifact_cache_stats():
+    return ARTIFACT_CACHE.stats()
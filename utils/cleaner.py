@@ -3,7 +3,12 @@ import time
 import shutil
 from datetime import datetime
 
+from core.engine.metadata_cache import purge_expired_entries
 from dir_setup import AUDIO_DIR, METADATA_DIR, VIDEO_DIR
+from utils.artifact_cache import ARTIFACT_CACHE
+from utils.content_store import CONTENT_STORE
+from utils.status_manager import cleanup_stale_statuses
+from utils.storage_index import STORAGE_INDEX
 
 
 CLEAN_INTERVAL_SECONDS = 10 * 60  # 10 minutes
@@ -11,11 +16,10 @@ CLEAN_INTERVAL_SECONDS = 10 * 60  # 10 minutes
 DIRS_TO_CLEAN = [
     VIDEO_DIR,
     AUDIO_DIR,
-    METADATA_DIR,
 ]
 
 # Ensure directories exist
-for d in DIRS_TO_CLEAN:
+for d in DIRS_TO_CLEAN + [METADATA_DIR]:
     os.makedirs(d, exist_ok=True)
 
 
@@ -50,6 +54,26 @@ def run_cleaner():
         for directory in DIRS_TO_CLEAN:
             print(f"    • Cleaning: {directory}")
             clean_directory(directory)
+            STORAGE_INDEX.clear_directory(directory)
+            CONTENT_STORE.forget_directory(directory)
+
+        # metadata entries carry their own TTLs; only expired ones go
+        purged = purge_expired_entries(METADATA_DIR)
+        if purged:
+            print(f"    • Purged {purged} expired metadata entries")
+
+        # cold conversions first; hot ones stay while the budget allows
+        evicted = ARTIFACT_CACHE.evict()
+        if evicted:
+            print(f"    • Evicted {evicted} cached conversions")
+
+        # blobs whose title-named links (or cached conversions) were just wiped
+        removed = CONTENT_STORE.collect_garbage()
+        if removed:
+            print(f"    • Removed {removed} unreferenced blobs")
+
+        # statuses idle for an hour; their files are gone by now anyway
+        cleanup_stale_statuses()
 
         end = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         print(f"[✓] CLEAN DONE  → {end}\n")
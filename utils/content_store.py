@@ -0,0 +1,311 @@
+# utils/content_store.py
+
+import errno
+import hashlib
+import json
+import os
+import struct
+import threading
+
+from dir_setup import STORAGE_DIR
+
+BLOB_DIR = os.path.join(STORAGE_DIR, "blobs")
+ALIAS_PATH = os.path.join(BLOB_DIR, "aliases.json")
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# ISO-BMFF containers whose box layout tells us whether the file is complete
+MP4_EXTENSIONS = {".mp4", ".m4a", ".m4v", ".mov"}
+# largest possible Ogg page: 27-byte header, 255 lacing values, 255 * 255 payload
+_OGG_MAX_PAGE = 27 + 255 + 255 * 255
+_EBML_ID = b"\x1a\x45\xdf\xa3"
+_SEGMENT_ID = b"\x18\x53\x80\x67"
+
+os.makedirs(BLOB_DIR, exist_ok=True)
+
+
+class IntegrityError(Exception):
+    pass
+
+
+def _mp4_complete(path: str, size: int) -> bool:
+    """
+    Walk the top-level boxes by their headers only. A truncated file ends
+    inside a box, so the sizes no longer add up to the file size.
+    """
+    offset = 0
+    seen = set()
+    with open(path, "rb") as fh:
+        while offset < size:
+            fh.seek(offset)
+            header = fh.read(8)
+            if len(header) < 8:
+                return False
+            box_size, box_type = struct.unpack(">I4s", header)
+            if box_size == 1:
+                large = fh.read(8)
+                if len(large) < 8:
+                    return False
+                box_size = struct.unpack(">Q", large)[0]
+            elif box_size == 0:
+                box_size = size - offset
+            if box_size < 8:
+                return False
+            seen.add(box_type)
+            offset += box_size
+    return offset == size and b"moov" in seen
+
+
+def _mp3_complete(path: str, size: int) -> bool:
+    """
+    The first frame must follow the ID3v2 tag; when it is a Xing/Info frame
+    carrying the stream length (ffmpeg and LAME write one), the file must
+    be at least that long.
+    """
+    with open(path, "rb") as fh:
+        head = fh.read(10)
+        offset = 0
+        if head[:3] == b"ID3" and len(head) == 10:
+            offset = 10 + ((head[6] & 0x7F) << 21 | (head[7] & 0x7F) << 14 | (head[8] & 0x7F) << 7 | (head[9] & 0x7F))
+            if head[5] & 0x10:
+                offset += 10  # footer
+        fh.seek(offset)
+        frame = fh.read(200)
+    if len(frame) < 4 or frame[0] != 0xFF or frame[1] & 0xE0 != 0xE0:
+        return False
+    for tag in (b"Xing", b"Info"):
+        i = frame.find(tag)
+        if i < 0:
+            continue
+        flags = int.from_bytes(frame[i + 4:i + 8], "big")
+        field = i + 8 + (4 if flags & 0x1 else 0)
+        if flags & 0x2 and len(frame) >= field + 4:
+            return size >= offset + int.from_bytes(frame[field:field + 4], "big")
+    return True
+
+
+def _ogg_complete(path: str, size: int) -> bool:
+    """Ogg (opus, vorbis): the last page must end exactly at EOF and carry the end-of-stream flag."""
+    with open(path, "rb") as fh:
+        if fh.read(4) != b"OggS":
+            return False
+        start = max(0, size - _OGG_MAX_PAGE)
+        fh.seek(start)
+        tail = fh.read()
+    i = tail.rfind(b"OggS")
+    if i < 0 or len(tail) < i + 27:
+        return False
+    count = tail[i + 26]
+    lacing = tail[i + 27:i + 27 + count]
+    if len(lacing) < count:
+        return False
+    return i + 27 + count + sum(lacing) == len(tail) and bool(tail[i + 5] & 0x04)
+
+
+def _vint(data: bytes, pos: int, keep_marker: bool):
+    """EBML variable-length integer at `pos`: (value, length, all value bits set)."""
+    first = data[pos]
+    length = 9 - first.bit_length() if first else 9
+    if length > 8 or pos + length > len(data):
+        raise ValueError("bad EBML integer")
+    value = first if keep_marker else first & (0xFF >> length)
+    for b in data[pos + 1:pos + length]:
+        value = (value << 8) | b
+    unknown = not keep_marker and value == (1 << (7 * length)) - 1
+    return value, length, unknown
+
+
+def _mkv_complete(path: str, size: int) -> bool:
+    """WebM/Matroska: the Segment element must span the rest of the file when its size is known."""
+    with open(path, "rb") as fh:
+        head = fh.read(64)
+    try:
+        if head[:4] != _EBML_ID:
+            return False
+        header_size, n, _ = _vint(head, 4, False)
+        pos = 4 + n + header_size
+        if head[pos:pos + 4] != _SEGMENT_ID:
+            return False
+        segment_size, n, unknown = _vint(head, pos + 4, False)
+    except (ValueError, IndexError):
+        return False
+    # live muxers leave the size unknown; nothing to compare against then
+    return unknown or pos + 4 + n + segment_size == size
+
+
+def _flac_complete(path: str, size: int) -> bool:
+    with open(path, "rb") as fh:
+        return fh.read(4) == b"fLaC"
+
+
+# extension -> check that a finished file is not cut short
+_CONTAINER_CHECKS = {
+    **{ext: _mp4_complete for ext in MP4_EXTENSIONS},
+    ".mp3": _mp3_complete,
+    ".opus": _ogg_complete,
+    ".ogg": _ogg_complete,
+    ".oga": _ogg_complete,
+    ".webm": _mkv_complete,
+    ".mkv": _mkv_complete,
+    ".mka": _mkv_complete,
+    ".flac": _flac_complete,
+}
+
+
+def _link_over(source: str, target: str):
+    """Atomically make `target` a hard link to `source`."""
+    tmp = f"{target}.{os.getpid()}.{threading.get_ident()}.lnk"
+    os.link(source, tmp)
+    try:
+        os.replace(tmp, target)
+    except OSError:
+        os.remove(tmp)
+        raise
+
+
+class ContentStore:
+    """
+    Media bytes stored once under blobs/<aa>/<sha256><ext>. The title-named
+    files under storage/videos and storage/audios are hard links to their
+    blob; where the filesystem refuses links, the title path is recorded in
+    an alias table instead and resolved at serve time.
+    """
+
+    def __init__(self, blob_dir: str, alias_path: str):
+        self.blob_dir = blob_dir
+        self.alias_path = alias_path
+        self._lock = threading.Lock()
+        self._counters = {"ingested": 0, "deduplicated": 0, "bytes_saved": 0, "corrupt": 0, "collected": 0, "trusted": 0}
+        try:
+            with open(alias_path, "r", encoding="utf-8") as fh:
+                self._aliases = json.load(fh)
+        except (OSError, ValueError):
+            self._aliases = {}
+
+    def _save_aliases(self):
+        tmp = f"{self.alias_path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(self._aliases, fh, separators=(",", ":"))
+        os.replace(tmp, self.alias_path)
+
+    def blob_path(self, digest: str, ext: str) -> str:
+        return os.path.join(self.blob_dir, digest[:2], f"{digest}{ext}")
+
+    def ingest(self, path: str, digest: str = None) -> dict:
+        """
+        Hash a finished download in one streaming pass and move its bytes
+        into the store. Raises IntegrityError for empty or truncated files.
+        `digest` skips the hashing when the caller wrote the bytes itself
+        and already knows it (a cached conversion placed from its blob).
+        """
+        ext = os.path.splitext(path)[1].lower()
+        size = os.path.getsize(path)
+        if size == 0:
+            raise IntegrityError(f"{os.path.basename(path)} is empty")
+        check = _CONTAINER_CHECKS.get(ext)
+        if check and not check(path, size):
+            with self._lock:
+                self._counters["corrupt"] += 1
+            raise IntegrityError(f"{os.path.basename(path)} is truncated")
+
+        if digest is None:
+            h = hashlib.sha256()
+            read = 0
+            with open(path, "rb") as fh:
+                for chunk in iter(lambda: fh.read(HASH_CHUNK_SIZE), b""):
+                    h.update(chunk)
+                    read += len(chunk)
+            if read != size:
+                # still being written by someone else
+                raise IntegrityError(f"{os.path.basename(path)} changed while hashing")
+            digest = h.hexdigest()
+        else:
+            with self._lock:
+                self._counters["trusted"] += 1
+
+        blob = self.blob_path(digest, ext)
+        os.makedirs(os.path.dirname(blob), exist_ok=True)
+
+        with self._lock:
+            deduplicated = os.path.exists(blob)
+            try:
+                if deduplicated:
+                    if not os.path.samefile(blob, path):
+                        _link_over(blob, path)
+                else:
+                    os.link(path, blob)
+                self._aliases.pop(os.path.abspath(path), None)
+            except OSError as e:
+                if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP):
+                    raise
+                # no hard links here: keep one copy in the store and alias the title path to it
+                if deduplicated:
+                    os.remove(path)
+                else:
+                    os.replace(path, blob)
+                self._aliases[os.path.abspath(path)] = os.path.relpath(blob, self.blob_dir)
+                self._save_aliases()
+
+            self._counters["ingested"] += 1
+            if deduplicated:
+                self._counters["deduplicated"] += 1
+                self._counters["bytes_saved"] += size
+
+        return {"digest": digest, "size": size, "blob": blob, "deduplicated": deduplicated}
+
+    def locate(self, path: str):
+        """Where the bytes for a title-named path live: the path itself, its alias, or None."""
+        if os.path.isfile(path):
+            return path
+        with self._lock:
+            rel = self._aliases.get(os.path.abspath(path))
+        if rel:
+            blob = os.path.join(self.blob_dir, rel)
+            if os.path.isfile(blob):
+                return blob
+        return None
+
+    def forget(self, path: str):
+        with self._lock:
+            if self._aliases.pop(os.path.abspath(path), None) is not None:
+                self._save_aliases()
+
+    def forget_directory(self, directory: str):
+        prefix = os.path.join(os.path.abspath(directory), "")
+        with self._lock:
+            stale = [p for p in self._aliases if p.startswith(prefix)]
+            for p in stale:
+                del self._aliases[p]
+            if stale:
+                self._save_aliases()
+
+    def collect_garbage(self) -> int:
+        """Delete blobs that no title-named link or alias points at any more."""
+        with self._lock:
+            aliased = set(self._aliases.values())
+            removed = 0
+            for root, _, files in os.walk(self.blob_dir):
+                for name in files:
+                    path = os.path.join(root, name)
+                    if path == self.alias_path or name.endswith(".tmp"):
+                        continue
+                    try:
+                        if os.stat(path).st_nlink <= 1 and os.path.relpath(path, self.blob_dir) not in aliased:
+                            os.remove(path)
+                            removed += 1
+                    except OSError:
+                        continue
+            self._counters["collected"] += removed
+        return removed
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._counters)
+            stats["aliases"] = len(self._aliases)
+        return stats
+
+
+CONTENT_STORE = ContentStore(BLOB_DIR, ALIAS_PATH)
+
+
+def get_content_store_stats():
+    return CONTENT_STORE.stats()
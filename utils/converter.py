@@ -7,11 +7,13 @@ from typing import Optional, Callable
 
 # Configurations
 try:
-    from config.server_config import FINAL_IP, SERVER_URL
+    from config.server_config import SERVER_URL
     from dir_setup import AUDIO_DIR, VIDEO_DIR
+    from utils.artifact_cache import ARTIFACT_CACHE, artifact_key, file_digest
 except ImportError:
-    FINAL_IP = "http://localhost:8000"
+    SERVER_URL = "http://localhost:8000"
     AUDIO_DIR, VIDEO_DIR = "downloads/audio", "downloads/video"
+    ARTIFACT_CACHE = None
 
 AUDIO_DIR, VIDEO_DIR = Path(AUDIO_DIR), Path(VIDEO_DIR)
 for d in [AUDIO_DIR, VIDEO_DIR]: d.mkdir(parents=True, exist_ok=True)
@@ -43,6 +45,19 @@ def convert_video_to_audio(
     title_tag = f"SoniEffect Converted Audio #{rand_3}"
     artist_tag = "SoniEffect"
 
+    # Same upload at the same settings: link the earlier output instead of re-encoding
+    cache_key = None
+    if ARTIFACT_CACHE is not None:
+        tags = {"artist": artist_tag, "album": "SoniEffect Conversions", "cover": LOGO_PATH.exists()}
+        cache_key = artifact_key(file_digest(str(input_file)), out_format, bitrate, tags)
+        if ARTIFACT_CACHE.fetch(cache_key, str(out_path.with_suffix(""))):
+            try:
+                input_file.unlink()
+            except OSError:
+                pass
+            print(f"[!] INFO: Reused cached conversion: {output_filename}")
+            return str(out_path)
+
     # --- THE MILLISECOND ENGINE ---
     # -hwaccel auto: Uses GPU if available (Nvidia/Intel/Apple)
     # -thread_queue_size: Prevents buffer bottlenecks on large files
@@ -111,6 +126,9 @@ def convert_video_to_audio(
 
     process.wait()
 
+    if cache_key and process.returncode == 0 and out_path.exists() and out_path.stat().st_size > 0:
+        ARTIFACT_CACHE.put(cache_key, str(out_path))
+
     # Post-Conversion Cleanup (Non-blocking)
     try:
         input_file.unlink()
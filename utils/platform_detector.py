@@ -1,6 +1,7 @@
 import os
 import re
-from typing import Optional
+from typing import Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlparse
 
 def detect_platform(url: str) -> str:
     url = url.lower().strip()
@@ -45,6 +46,90 @@ def detect_platform(url: str) -> str:
     return "unknown"
 
 
+
+# ---------------- CANONICALIZATION ----------------
+
+_YT_ID = r"([A-Za-z0-9_-]{11})(?![A-Za-z0-9_-])"
+
+# (platform, host regex, path-or-query regex); the first group is the media id
+_MEDIA_ID_PATTERNS = [
+    ("youtube", r"(^|\.)youtu\.be$", r"^/" + _YT_ID),
+    ("youtube", r"(^|\.)(youtube|youtube-nocookie)\.com$", r"^/(?:shorts|embed|live|v|e)/" + _YT_ID),
+    ("youtube", r"(^|\.)youtube\.com$", r"(?:^|&)v=" + _YT_ID),
+    ("tiktok", r"(^|\.)tiktok\.com$", r"/(?:video|photo|v)/(\d+)"),
+    ("instagram", r"(^|\.)(instagram\.com|instagr\.am)$", r"/(?:p|reels?|tv)/([A-Za-z0-9_-]+)"),
+    ("twitter", r"(^|\.)(twitter\.com|x\.com)$", r"/status(?:es)?/(\d+)"),
+    ("facebook", r"(^|\.)facebook\.com$", r"/(?:videos|reel|watch/live)/(?:[^/]+/)?(\d+)"),
+    ("facebook", r"(^|\.)facebook\.com$", r"(?:^|&)v=(\d+)"),
+    ("vimeo", r"(^|\.)vimeo\.com$", r"^/(?:video/|channels/[^/]+/)?(\d+)"),
+    ("dailymotion", r"(^|\.)dailymotion\.com$", r"/video/([A-Za-z0-9]+)"),
+    ("dailymotion", r"(^|\.)dai\.ly$", r"^/([A-Za-z0-9]+)"),
+    ("reddit", r"(^|\.)reddit\.com$", r"/comments/([A-Za-z0-9]+)"),
+    ("twitch", r"(^|\.)twitch\.tv$", r"/videos/(\d+)"),
+    ("twitch", r"^clips\.twitch\.tv$", r"^/([A-Za-z0-9_-]+)"),
+    ("bilibili", r"(^|\.)bilibili\.com$", r"/video/(BV[A-Za-z0-9]+|av\d+)"),
+    ("rumble", r"(^|\.)rumble\.com$", r"^/(v(?=[a-z]*[0-9])[a-z0-9]{4,})(?=[-.]|$)"),  # ids carry a digit: /videos is not one
+    ("pinterest", r"(^|\.)pinterest\.[a-z.]+$", r"/pin/(\d+)"),
+]
+
+# Query parameters that never change which media a URL points at
+_TRACKING_PARAMS = {
+    "si", "feature", "pp", "fbclid", "gclid", "igshid", "igsh", "ref", "ref_src",
+    "ref_url", "_r", "_t", "is_from_webapp", "sender_device", "mibextid", "rdid", "share_url",
+}
+
+
+def _split_url(url: str):
+    url = (url or "").strip()
+    if "://" not in url:
+        url = f"https://{url}"
+    parsed = urlparse(url)
+    host = (parsed.hostname or "").lower()
+    for prefix in ("www.", "m.", "mobile.", "music."):
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+            break
+    return host, parsed
+
+
+def normalize_url(url: str) -> str:
+    """Offline URL cleanup: scheme, host prefixes, tracking params, fragment."""
+    host, parsed = _split_url(url)
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parsed.query, keep_blank_values=True)
+        if k.lower() not in _TRACKING_PARAMS and not k.lower().startswith("utm_")
+    )
+    path = parsed.path.rstrip("/") or ""
+    return f"https://{host}{path}" + (f"?{urlencode(query)}" if query else "")
+
+
+def canonicalize_url(url: str) -> Tuple[str, Optional[str]]:
+    """
+    Map a URL to (platform, media_id) without network access.
+    media_id is None when the URL shape is not recognised (short links,
+    profiles, playlists...).
+    """
+    host, parsed = _split_url(url)
+    for platform, host_pattern, id_pattern in _MEDIA_ID_PATTERNS:
+        if not re.search(host_pattern, host):
+            continue
+        m = re.search(id_pattern, parsed.path) or re.search(id_pattern, parsed.query)
+        if m:
+            return platform, m.group(1)
+    return detect_platform(url), None
+
+
+def media_key(url: str) -> str:
+    """
+    Universal cache / dedup key: `platform:media_id`, or the normalized
+    URL when no media id can be derived offline.
+    """
+    platform, media_id = canonicalize_url(url)
+    if media_id:
+        return f"{platform}:{media_id}"
+    return f"{platform}:{normalize_url(url)}"
+
+
 COOKIE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "cookies"))
 
 FILENAME_MAP = {
@@ -0,0 +1,189 @@
+# utils/state_backend.py
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from dir_setup import STATE_DIR
+
+try:
+    import redis  # type: ignore
+except ImportError:
+    redis = None
+
+# memory: every worker keeps its own state (single-worker deployments)
+# sqlite: one WAL database shared by the workers of one host
+# redis:  any Redis-protocol server, shared by workers on any host
+STATE_BACKEND = os.getenv("SAVIFYPRO_STATE_BACKEND", "memory").strip().lower()
+STATE_DB_PATH = os.getenv("SAVIFYPRO_STATE_DB", os.path.join(STATE_DIR, "shared_state.sqlite3"))
+REDIS_URL = os.getenv("SAVIFYPRO_REDIS_URL", "redis://localhost:6379/0")
+REDIS_PREFIX = "savifypro"
+# longest a single backend call may block; shared state is best effort
+STATE_TIMEOUT = float(os.getenv("SAVIFYPRO_STATE_TIMEOUT", "2"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS kv (
+    ns         TEXT NOT NULL,
+    key        TEXT NOT NULL,
+    value      TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (ns, key)
+)
+"""
+
+
+class MemoryBackend:
+    """Nothing shared: callers keep using their in-process structures."""
+
+    name = "memory"
+    shared = False
+
+    def get(self, ns: str, key: str):
+        return None
+
+    def set(self, ns: str, key: str, value, ttl: float):
+        pass
+
+    def delete(self, ns: str, key: str):
+        pass
+
+    def purge_expired(self) -> int:
+        return 0
+
+    def stats(self) -> dict:
+        return {"backend": self.name}
+
+
+class SQLiteBackend:
+    """JSON values with absolute expiries in one WAL database; readers never block the writer."""
+
+    name = "sqlite"
+    shared = True
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=STATE_TIMEOUT)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(_SCHEMA)
+        self._counters = {"reads": 0, "writes": 0, "errors": 0}
+
+    def _execute(self, sql: str, args=(), counter: str = None):
+        with self._lock:
+            try:
+                rows = self._conn.execute(sql, args).fetchall()
+            except sqlite3.Error as e:
+                # another worker holding the write lock too long; state is best effort
+                self._counters["errors"] += 1
+                print(f"[✕] Shared state query failed: {e}")
+                return []
+            if counter:
+                self._counters[counter] += 1
+            return rows
+
+    def get(self, ns: str, key: str):
+        rows = self._execute(
+            "SELECT value FROM kv WHERE ns = ? AND key = ? AND expires_at > ?",
+            (ns, key, time.time()), "reads",
+        )
+        return json.loads(rows[0][0]) if rows else None
+
+    def set(self, ns: str, key: str, value, ttl: float):
+        self._execute(
+            "INSERT INTO kv (ns, key, value, expires_at) VALUES (?, ?, ?, ?)"
+            " ON CONFLICT(ns, key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at",
+            (ns, key, json.dumps(value, separators=(",", ":"), default=str), time.time() + ttl), "writes",
+        )
+
+    def delete(self, ns: str, key: str):
+        self._execute("DELETE FROM kv WHERE ns = ? AND key = ?", (ns, key), "writes")
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            try:
+                return self._conn.execute("DELETE FROM kv WHERE expires_at <= ?", (time.time(),)).rowcount
+            except sqlite3.Error:
+                return 0
+
+    def stats(self) -> dict:
+        rows = self._execute("SELECT COUNT(*) FROM kv")
+        with self._lock:
+            stats = dict(self._counters)
+        stats.update({"backend": self.name, "entries": rows[0][0] if rows else None})
+        return stats
+
+
+class RedisBackend:
+    """Values under savifypro:<ns>:<key> with native expiry; `client` lets a stand-in server be used."""
+
+    name = "redis"
+    shared = True
+
+    def __init__(self, url: str = REDIS_URL, client=None):
+        self._client = client or redis.Redis.from_url(
+            url, socket_timeout=STATE_TIMEOUT, socket_connect_timeout=STATE_TIMEOUT
+        )
+        self._lock = threading.Lock()
+        self._counters = {"reads": 0, "writes": 0, "errors": 0}
+
+    def _count(self, name: str):
+        with self._lock:
+            self._counters[name] += 1
+
+    def _call(self, counter: str, fn, *args, **kwargs):
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            self._count("errors")
+            print(f"[✕] Shared state request failed: {e}")
+            return None
+        self._count(counter)
+        return result
+
+    @staticmethod
+    def _key(ns: str, key: str) -> str:
+        return f"{REDIS_PREFIX}:{ns}:{key}"
+
+    def get(self, ns: str, key: str):
+        raw = self._call("reads", self._client.get, self._key(ns, key))
+        return json.loads(raw) if raw else None
+
+    def set(self, ns: str, key: str, value, ttl: float):
+        raw = json.dumps(value, separators=(",", ":"), default=str)
+        self._call("writes", self._client.set, self._key(ns, key), raw, ex=max(1, int(ttl)))
+
+    def delete(self, ns: str, key: str):
+        self._call("writes", self._client.delete, self._key(ns, key))
+
+    def purge_expired(self) -> int:
+        # the server expires keys itself
+        return 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._counters)
+        stats["backend"] = self.name
+        return stats
+
+
+def create_backend(kind: str = STATE_BACKEND):
+    if kind == "sqlite":
+        return SQLiteBackend(STATE_DB_PATH)
+    if kind == "redis":
+        if redis is None:
+            print("[✕] ERROR: SAVIFYPRO_STATE_BACKEND=redis but the redis package is not installed; using memory")
+            return MemoryBackend()
+        return RedisBackend(REDIS_URL)
+    if kind != "memory":
+        print(f"[✕] ERROR: Unknown state backend {kind!r}; using memory")
+    return MemoryBackend()
+
+
+SHARED_STATE = create_backend()
+
+
+def get_state_backend_stats():
+    return SHARED_STATE.stats()
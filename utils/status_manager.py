@@ -2,12 +2,12 @@
 
 import os
 import copy
-from threading import Lock
+from collections import deque
+from threading import Condition, Lock, Thread
 from time import time
+from types import MappingProxyType
 
-_status_map = {}
-_timestamp_map = {}
-_lock = Lock()
+from utils.state_backend import SHARED_STATE
 
 DEFAULT_STATUS = {
     "status": "pending",           # pending, extracting, downloading, converting, completed, error, canceled
@@ -34,107 +34,281 @@ DEFAULT_STATUS = {
 }
 
 MIN_VALID_FILESIZE = 512 * 1024  # 512KB minimum valid file
+HISTORY_LIMIT = int(os.getenv("SAVIFYPRO_STATUS_HISTORY", "50"))  # newest entries kept per download
+STATUS_STRIPES = 16  # independent locks; updates to different downloads rarely contend
+STATUS_TTL = 3600  # shared copies expire like idle local records (see cleanup_stale_statuses)
 
-def _ensure_initialized(download_id: str):
-    if download_id not in _status_map:
-        now = int(time())
-        _status_map[download_id] = copy.deepcopy(DEFAULT_STATUS)
-        _status_map[download_id]["created_at"] = now
-        _timestamp_map[download_id] = now
-
-def _log_history(download_id: str, event: str, extra: dict = None):
-    if download_id not in _status_map:
-        return
-    entry = {
-        "time": int(time()),
-        "event": event,
-        **(extra or {})
-    }
-    _status_map[download_id]["history"].append(entry)
+_FIELDS = tuple(k for k in DEFAULT_STATUS if k != "history")
+_FIELD_SET = frozenset(_FIELDS)
+_FINAL_STATES = {"completed", "converted", "error", "canceled"}
 
-def update_status(download_id: str, data: dict):
-    with _lock:
-        _ensure_initialized(download_id)
-        now = int(time())
-        status_entry = _status_map[download_id]
 
-        # merge updates
+class _StatusRecord:
+    """One download's status. Readers get `view`, an immutable snapshot rebuilt only after a write."""
+
+    __slots__ = _FIELDS + ("history", "extra", "touched_at", "watchers", "_view")
+
+    def __init__(self, now: int):
+        for k in _FIELDS:
+            setattr(self, k, DEFAULT_STATUS[k])
+        self.created_at = now
+        self.touched_at = now
+        self.history = deque(maxlen=HISTORY_LIMIT)
+        self.extra = {}
+        self.watchers = ()
+        self._view = None
+
+    def merge(self, data: dict):
         for k, v in data.items():
-            status_entry[k] = v
+            if k in _FIELD_SET:
+                setattr(self, k, v)
+            elif k != "history":
+                self.extra[k] = v
+        self._view = None
 
-        status_entry["timestamp"] = now
-        _timestamp_map[download_id] = now
+    def log(self, event: str, extra: dict = None):
+        self.history.append({"time": int(time()), "event": event, **(extra or {})})
+        self._view = None
+
+    def view(self):
+        if self._view is None:
+            snapshot = {k: getattr(self, k) for k in _FIELDS}
+            snapshot.update(self.extra)
+            snapshot["history"] = tuple(self.history)
+            self._view = MappingProxyType(snapshot)
+        return self._view
+
+
+class _Stripe:
+    __slots__ = ("lock", "records")
+
+    def __init__(self):
+        self.lock = Lock()
+        self.records = {}
+
+
+_stripes = tuple(_Stripe() for _ in range(STATUS_STRIPES))
+
+
+def _stripe(download_id: str) -> _Stripe:
+    return _stripes[hash(download_id) % STATUS_STRIPES]
+
+
+def _record(stripe: _Stripe, download_id: str) -> _StatusRecord:
+    """Existing record, or a new one; only writers create records."""
+    record = stripe.records.get(download_id)
+    if record is None:
+        record = stripe.records[download_id] = _StatusRecord(int(time()))
+    return record
+
+
+def _plain(view) -> dict:
+    status = dict(view)
+    status["history"] = list(status["history"])
+    return status
+
+
+class _SharedPublisher:
+    """
+    Copies status changes to the shared backend from one background thread,
+    so writers never wait on SQLite or Redis. Only the latest snapshot per
+    download is kept pending and batches go out in order, so a newer state
+    always lands after an older one.
+    """
+
+    def __init__(self):
+        self._pending = {}
+        self._cond = Condition()
+        self._thread = None
+
+    def publish(self, download_id: str, snapshot):
+        """`snapshot` None deletes the shared copy."""
+        with self._cond:
+            self._pending[download_id] = snapshot
+            if self._thread is None:
+                self._thread = Thread(target=self._run, name="status-publisher", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._pending)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                batch, self._pending = self._pending, {}
+            for download_id, snapshot in batch.items():
+                try:
+                    if snapshot is None:
+                        SHARED_STATE.delete("status", download_id)
+                    else:
+                        SHARED_STATE.set("status", download_id, snapshot, STATUS_TTL)
+                except Exception as e:
+                    print(f"[✕] Failed to publish status for {download_id}: {e}")
+
+
+_publisher = _SharedPublisher()
 
-        # add to history
-        _log_history(download_id, "update", data)
+
+def _shared_view(download_id: str):
+    """Status written by another worker process, when a shared backend is configured."""
+    if not SHARED_STATE.shared:
+        return None
+    status = SHARED_STATE.get("status", download_id)
+    if status is None:
+        return None
+    status["history"] = tuple(status.get("history") or ())
+    return MappingProxyType(status)
+
+
+def _apply(download_id: str, data: dict, event: str = "update", extra: dict = None):
+    stripe = _stripe(download_id)
+    with stripe.lock:
+        record = _record(stripe, download_id)
+        now = int(time())
+        record.merge(data)
+        record.timestamp = now
+        record.touched_at = now
 
         # completed/error state tracking
-        if data.get("status") in {"completed", "converted", "error", "canceled"}:
-            status_entry["completed_at"] = now
+        if data.get("status") in _FINAL_STATES and "completed_at" not in data:
+            record.completed_at = now
+
+        # add to history
+        record.log(event, data if extra is None else extra)
+        watchers = record.watchers
+
+        if SHARED_STATE.shared:
+            # snapshot under the lock, written to the backend by the publisher thread
+            _publisher.publish(download_id, _plain(record.view()))
+
+    # outside the lock: a watcher may read the status straight away
+    _notify(download_id, watchers)
+
+def _notify(download_id: str, watchers):
+    for callback in watchers:
+        try:
+            callback()
+        except Exception as e:
+            print(f"[✕] Status watcher failed for {download_id}: {e}")
+
+def update_status(download_id: str, data: dict):
+    _apply(download_id, data)
 
 def safe_complete(download_id: str, filepath: str = None):
-    with _lock:
-        _ensure_initialized(download_id)
-        now = int(time())
-        if filepath and os.path.exists(filepath):
-            size = os.path.getsize(filepath)
-            if size >= MIN_VALID_FILESIZE:
-                _status_map[download_id].update({
-                    "status": "completed",
-                    "completed_at": now,
-                    "timestamp": now,
-                    "filename": os.path.basename(filepath),
-                    "filesize": size
-                })
-                _log_history(download_id, "completed", {"file": filepath, "size": size})
-                return True
-            else:
-                update_status(download_id, {
-                    "status": "error",
-                    "message": f"File too small ({size} bytes), download likely failed.",
-                    "error": "incomplete_file"
-                })
-                return False
-        else:
-            update_status(download_id, {
-                "status": "error",
-                "message": "Download file missing or invalid.",
-                "error": "missing_file"
-            })
-            return False
-
-def get_status(download_id: str, deep_copy=True) -> dict:
-    with _lock:
-        _ensure_initialized(download_id)
-        status = _status_map.get(download_id, DEFAULT_STATUS.copy())
-        return copy.deepcopy(status) if deep_copy else status
+    if filepath and os.path.exists(filepath):
+        size = os.path.getsize(filepath)
+        if size >= MIN_VALID_FILESIZE:
+            _apply(download_id, {
+                "status": "completed",
+                "filename": os.path.basename(filepath),
+                "filesize": size
+            }, event="completed", extra={"file": filepath, "size": size})
+            return True
+        update_status(download_id, {
+            "status": "error",
+            "message": f"File too small ({size} bytes), download likely failed.",
+            "error": "incomplete_file"
+        })
+        return False
+    update_status(download_id, {
+        "status": "error",
+        "message": "Download file missing or invalid.",
+        "error": "missing_file"
+    })
+    return False
+
+def get_status(download_id: str, deep_copy=False):
+    """
+    Read-only view of a download's status, or None for an unknown id.
+    Views are shared between readers and never change; pass deep_copy
+    for a private mutable dict. Ids unknown here are looked up in the
+    shared backend, which is I/O: async callers use run_in_threadpool.
+    """
+    stripe = _stripe(download_id)
+    with stripe.lock:
+        record = stripe.records.get(download_id)
+        view = record.view() if record is not None else None
+    if view is None:
+        # the job may be running in another worker
+        view = _shared_view(download_id)
+        if view is None:
+            return None
+    if not deep_copy:
+        return view
+    return copy.deepcopy(_plain(view))
+
+def watch(download_id: str, callback):
+    """
+    Call `callback()` (no arguments, from the writer's thread) after every
+    change to a download known to this process, and once more when it is
+    removed (the status then reads None). Returns an unwatch function,
+    or None for an id this process does not hold. Watchers read the latest view themselves, so a slow one
+    skips intermediate states instead of queueing them.
+    """
+    stripe = _stripe(download_id)
+    with stripe.lock:
+        record = stripe.records.get(download_id)
+        if record is None:
+            return None
+        # copy-on-write: writers iterate the tuple they saw without holding the lock
+        record.watchers = record.watchers + (callback,)
+
+    def unwatch():
+        with stripe.lock:
+            record.watchers = tuple(w for w in record.watchers if w is not callback)
+
+    return unwatch
 
 def clear_status(download_id: str):
-    with _lock:
-        _status_map.pop(download_id, None)
-        _timestamp_map.pop(download_id, None)
+    stripe = _stripe(download_id)
+    with stripe.lock:
+        record = stripe.records.pop(download_id, None)
+    if SHARED_STATE.shared:
+        _publisher.publish(download_id, None)
+    if record is not None:
+        _notify(download_id, record.watchers)
 
 def cleanup_stale_statuses(timeout_seconds=3600, remove_completed=True):
     """Remove old statuses after `timeout_seconds` of inactivity."""
-    with _lock:
-        now = int(time())
-        stale_ids = []
-        for did, ts in _timestamp_map.items():
-            st = _status_map.get(did, {})
-            if now - ts > timeout_seconds:
-                if remove_completed or st.get("status") not in {"completed", "converted"}:
-                    stale_ids.append(did)
-        for did in stale_ids:
-            _status_map.pop(did, None)
-            _timestamp_map.pop(did, None)
+    now = int(time())
+    removed = []
+    for stripe in _stripes:
+        with stripe.lock:
+            stale_ids = [
+                did for did, record in stripe.records.items()
+                if now - record.touched_at > timeout_seconds
+                and (remove_completed or record.status not in {"completed", "converted"})
+            ]
+            for did in stale_ids:
+                removed.append((did, stripe.records.pop(did).watchers))
+    for did, watchers in removed:
+        _notify(did, watchers)
+    SHARED_STATE.purge_expired()
+
+def get_status_stats() -> dict:
+    entries = 0
+    watchers = 0
+    for stripe in _stripes:
+        with stripe.lock:
+            entries += len(stripe.records)
+            watchers += sum(len(r.watchers) for r in stripe.records.values())
+    return {"entries": entries, "watchers": watchers, "stripes": STATUS_STRIPES,
+            "backend": SHARED_STATE.name, "unpublished": _publisher.pending()}
 
 def list_all_statuses(include_meta=False, deep_copy=True) -> dict:
-    with _lock:
-        if include_meta:
-            return copy.deepcopy(_status_map) if deep_copy else _status_map
-        else:
-            return {
-                k: {
+    statuses = {}
+    for stripe in _stripes:
+        with stripe.lock:
+            views = {did: record.view() for did, record in stripe.records.items()}
+        for did, v in views.items():
+            if include_meta:
+                statuses[did] = copy.deepcopy(dict(v)) if deep_copy else v
+            else:
+                statuses[did] = {
                     "status": v["status"],
                     "progress": v["progress"],
                     "speed": v["speed"],
@@ -142,22 +316,19 @@ def list_all_statuses(include_meta=False, deep_copy=True) -> dict:
                     "file_type": v.get("file_type", "video"),
                     "filename": v.get("filename")
                 }
-                for k, v in _status_map.items()
-            }
+    return statuses
 
 def mark_error(download_id: str, error_message: str):
-    update_status(download_id, {
+    _apply(download_id, {
         "status": "error",
         "error": error_message,
         "message": "Download failed",
         "completed_at": int(time())
-    })
-    _log_history(download_id, "error", {"error": error_message})
+    }, event="error", extra={"error": error_message})
 
 def mark_cancelled(download_id: str):
-    update_status(download_id, {
+    _apply(download_id, {
         "status": "canceled",
         "message": "Download canceled by user",
         "completed_at": int(time())
-    })
-    _log_history(download_id, "canceled")
+    }, event="canceled", extra={})
@@ -0,0 +1,213 @@
+# utils/storage_index.py
+
+import json
+import os
+import threading
+
+from dir_setup import AUDIO_DIR, STORAGE_DIR, VIDEO_DIR
+from utils.content_store import CONTENT_STORE
+
+MANIFEST_PATH = os.path.join(STORAGE_DIR, "index.json")
+
+STORAGE_DIRS = {
+    "video": VIDEO_DIR,
+    "audio": AUDIO_DIR,
+}
+
+
+def _entry_key(kind: str, media: str, quality: str) -> str:
+    return f"{kind}|{media}|{quality or ''}"
+
+
+def _stat(path: str):
+    """(size, mtime) of the bytes behind a title-named path, following content-store aliases."""
+    located = CONTENT_STORE.locate(path)
+    if located is None:
+        return None
+    st = os.stat(located)
+    return st.st_size, int(st.st_mtime)
+
+
+class StorageIndex:
+    """
+    Finished downloads keyed by (kind, canonical media key, quality).
+
+    Entries remember the file's size, mtime and content digest; a lookup
+    costs one stat() and silently drops entries whose file was deleted,
+    truncated or replaced behind our back. The manifest is only a startup
+    hint and is re-checked against a single scandir() per directory when
+    loaded.
+    """
+
+    def __init__(self, manifest_path: str, dirs: dict):
+        self.manifest_path = manifest_path
+        self.dirs = dirs
+        self._entries = {}
+        self._by_path = {}
+        self._lock = threading.Lock()
+        # writers serialize here, outside _lock; a snapshot older than the file on disk is dropped
+        self._save_lock = threading.Lock()
+        self._version = 0
+        self._written = 0
+        self._counters = {"hits": 0, "misses": 0, "stale": 0}
+        self.load()
+
+    # ----- persistence -----
+
+    def load(self):
+        """Rebuild from the manifest, keeping only entries whose file is still there unchanged."""
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as fh:
+                raw = json.load(fh)
+        except (OSError, ValueError):
+            raw = {}
+
+        present = {}
+        for kind, directory in self.dirs.items():
+            try:
+                with os.scandir(directory) as it:
+                    for de in it:
+                        if de.is_file():
+                            st = de.stat()
+                            present[(kind, de.name)] = (st.st_size, int(st.st_mtime))
+            except FileNotFoundError:
+                continue
+
+        entries = {}
+        for key, entry in (raw.get("entries") or {}).items():
+            try:
+                stat = present.get((entry["kind"], entry["name"]))
+                if stat is None:
+                    stat = _stat(os.path.join(self.dirs[entry["kind"]], entry["name"]))
+                if stat and stat == (entry["size"], entry["mtime"]):
+                    entries[key] = entry
+            except (KeyError, TypeError, OSError):
+                continue
+
+        with self._lock:
+            self._entries = entries
+            self._by_path = {self._path(e): k for k, e in entries.items()}
+            dropped = len(raw.get("entries") or {}) - len(entries)
+        if dropped:
+            self._save()
+        print(f"[!] INFO: Storage index loaded {len(entries)} entries ({dropped} stale)")
+
+    def _save(self):
+        with self._lock:
+            self._version += 1
+            version = self._version
+            data = json.dumps({"entries": self._entries}, separators=(",", ":"))
+        with self._save_lock:
+            if version < self._written:
+                return
+            self._write(data)
+            self._written = version
+
+    def _write(self, data: str):
+        tmp = f"{self.manifest_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as fh:
+                fh.write(data)
+            os.replace(tmp, self.manifest_path)
+        except OSError as e:
+            print(f"[✕] Failed to write storage index: {e}")
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+
+    def _path(self, entry: dict) -> str:
+        return os.path.join(self.dirs[entry["kind"]], entry["name"])
+
+    # ----- lookups and updates -----
+
+    def lookup(self, kind: str, media: str, quality: str = None):
+        """Path of a finished, non-empty file for this media, or None."""
+        key = _entry_key(kind, media, quality)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._counters["misses"] += 1
+                return None
+            path = self._path(entry)
+
+        try:
+            stat = _stat(path)
+            fresh = stat is not None and stat[0] > 0 and stat == (entry["size"], entry["mtime"])
+        except OSError:
+            fresh = False
+
+        if fresh:
+            with self._lock:
+                self._counters["hits"] += 1
+            return path
+
+        with self._lock:
+            if self._entries.get(key) is entry:
+                del self._entries[key]
+                self._by_path.pop(path, None)
+            self._counters["stale"] += 1
+            self._counters["misses"] += 1
+        self._save()
+        return None
+
+    def add(self, kind: str, media: str, quality: str, path: str, digest: str = None):
+        """Record a file that has just been written completely."""
+        stat = _stat(path)
+        if stat is None:
+            raise FileNotFoundError(path)
+        key = _entry_key(kind, media, quality)
+        entry = {
+            "kind": kind,
+            "name": os.path.basename(path),
+            "size": stat[0],
+            "mtime": stat[1],
+            "digest": digest,
+        }
+        with self._lock:
+            path = self._path(entry)
+            # one file per key and one key per file; re-downloads replace both sides
+            old_key = self._by_path.pop(path, None)
+            if old_key is not None:
+                self._entries.pop(old_key, None)
+            old = self._entries.get(key)
+            if old is not None:
+                self._by_path.pop(self._path(old), None)
+            self._entries[key] = entry
+            self._by_path[path] = key
+        self._save()
+
+    def discard(self, path: str):
+        """Forget a file that was deleted."""
+        with self._lock:
+            key = self._by_path.pop(os.path.abspath(path), None)
+            if key is None:
+                return
+            self._entries.pop(key, None)
+        self._save()
+
+    def clear_directory(self, directory: str):
+        """Forget everything under `directory` (used by the cleaner after wiping it)."""
+        directory = os.path.abspath(directory)
+        with self._lock:
+            kinds = {k for k, d in self.dirs.items() if os.path.abspath(d) == directory}
+            if not kinds:
+                return
+            for key, entry in list(self._entries.items()):
+                if entry["kind"] in kinds:
+                    del self._entries[key]
+                    self._by_path.pop(self._path(entry), None)
+        self._save()
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._counters)
+            stats["entries"] = len(self._entries)
+        return stats
+
+
+STORAGE_INDEX = StorageIndex(MANIFEST_PATH, STORAGE_DIRS)
+
+
+def get_storage_stats():
+    return STORAGE_INDEX.stats()